@@ -0,0 +1,196 @@
+#bibliotecas
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from functions.Get import Get
+from mock_server import MockServer
+
+#call functions measured and their arguments
+CALLS = {
+    'call_abonos' : lambda args: {'start_date' : '2020-01-01', 'end_date' : '2023-12-31'},
+    'call_afastamentos' : lambda args: {},
+    'call_banco_horas' : lambda args: {'employee_id' : list(range(1, args.employees + 1))},
+    'call_centro_custo' : lambda args: {},
+    'call_cidade' : lambda args: {},
+    'call_colaboradores' : lambda args: {},
+    'call_departamento' : lambda args: {},
+    'call_excecoes_jornada' : lambda args: {'start_date' : '2020-01-01', 'end_date' : '2023-12-31'},
+    'call_feriados' : lambda args: {},
+    'call_gestores' : lambda args: {},
+    'call_grupo_acesso' : lambda args: {},
+    'call_unidade_negocio' : lambda args: {},
+    'call_usuarios' : lambda args: {},
+}
+
+def measure(function):
+    '''
+    Function to run a function measuring its wall time and the peak memory allocated while it runs
+
+    Args:
+        function: function without arguments
+
+    Returns:
+        tuple of the function return, seconds and peak MB
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+def new_get(args, server, store_type = None):
+    get = Get('benchmark', store_type)
+    get.base_url = server.base_url
+    get.max_workers = args.max_workers
+    get.backoff_base = 0.01
+    get.compact = args.compact
+    get.xlsx_stream = args.xlsx_stream
+    return get
+
+def bench_calls(args, server):
+    '''
+    Function to measure every call function against the mock server, without storing
+
+    Args:
+        args: parsed command line arguments
+        server: running MockServer
+
+    Returns:
+        dict of name and metrics
+    '''
+    results = {}
+    for method in args.calls or CALLS:
+        with new_get(args, server) as get:
+            df, seconds, peak = measure(lambda: getattr(get, method)(method, return_df = True, **CALLS[method](args)))
+            stats = get.summary()
+
+        results[method] = {'seconds' : seconds, 'rows' : len(df), 'rows_per_second' : len(df) / seconds if seconds else 0,
+                           'requests' : int(stats['requests'].sum()), 'retries' : int(stats['retries'].sum()), 'peak_mb' : peak}
+        print('{:<28} {:>8} rows {:>8.2f}s {:>10.0f} rows/s {:>8.1f} MB'.format(method, len(df), seconds,
+                                                                                 results[method]['rows_per_second'], peak))
+
+    return results
+
+def bench_stores(args, server):
+    '''
+    Function to measure every store backend storing the same call_banco_horas dataframe
+
+    Args:
+        args: parsed command line arguments
+        server: running MockServer
+
+    Returns:
+        dict of name and metrics
+    '''
+    with new_get(args, server) as get:
+        df = get.call_banco_horas('banco_horas', CALLS['call_banco_horas'](args)['employee_id'], return_df = True)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as local_path:
+        for store_type in args.stores:
+            with new_get(args, server, store_type) as get:
+                get.local_path = local_path
+                if store_type in ('postgres', 'mysql'):
+                    if not args.db_host:
+                        print('{:<28} skipped, no --db-host'.format('store_' + store_type))
+                        continue
+                    get.store_mode = 'create'
+                    get.database, get.db_user, get.db_password = args.database, args.db_user, args.db_password
+                    get.db_host, get.db_port = args.db_host, args.db_port or (5432 if store_type == 'postgres' else 3306)
+
+                try:
+                    _, seconds, peak = measure(lambda: get._store(df, 'bench_banco_horas', 'time_balance_entries'))
+                except ImportError as error:
+                    print('{:<28} skipped, {}'.format('store_' + store_type, error))
+                    continue
+
+            name = 'store_' + store_type
+            results[name] = {'seconds' : seconds, 'rows' : len(df), 'rows_per_second' : len(df) / seconds if seconds else 0,
+                             'peak_mb' : peak}
+            print('{:<28} {:>8} rows {:>8.2f}s {:>10.0f} rows/s {:>8.1f} MB'.format(name, len(df), seconds,
+                                                                                     results[name]['rows_per_second'], peak))
+
+    return results
+
+def compare(results, baseline, tolerance):
+    '''
+    Function to compare the results with a baseline run
+
+    Args:
+        results: dict of name and metrics of this run
+        baseline: dict of name and metrics of the baseline run
+        tolerance: accepted fraction of throughput loss or memory growth
+
+    Returns:
+        list of regressed names
+    '''
+    regressions = []
+    print('\n{:<28} {:>12} {:>12}'.format('benchmark', 'rows/s', 'peak MB'))
+    for name, metrics in results.items():
+        if name not in baseline:
+            continue
+
+        speed = metrics['rows_per_second'] / baseline[name]['rows_per_second'] - 1 if baseline[name]['rows_per_second'] else 0
+        memory = metrics['peak_mb'] / baseline[name]['peak_mb'] - 1 if baseline[name]['peak_mb'] else 0
+        print('{:<28} {:>+11.1%} {:>+11.1%}'.format(name, speed, memory))
+
+        if speed < -tolerance or memory > tolerance:
+            regressions.append(name)
+
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Benchmark the Get calls and store backends against a local mock API')
+    parser.add_argument('--rows', type = int, default = 5000, help = 'records per endpoint (per employee for time_balance_entries)')
+    parser.add_argument('--employees', type = int, default = 20, help = 'employee ids passed to call_banco_horas')
+    parser.add_argument('--latency', type = float, default = 0.02, help = 'seconds added to every mock response')
+    parser.add_argument('--max-per-page', type = int, default = 100, help = 'largest per_page honoured by the mock')
+    parser.add_argument('--throttle', type = float, default = 0, help = 'fraction of requests answered with HTTP 429')
+    parser.add_argument('--max-workers', type = int, default = 8, help = 'Get.max_workers')
+    parser.add_argument('--compact', action = 'store_true', help = 'convert the results to the compact dtypes (Get.compact)')
+    parser.add_argument('--xlsx-stream', action = 'store_true', help = 'write the xlsx store row by row (Get.xlsx_stream)')
+    parser.add_argument('--calls', nargs = '*', choices = sorted(CALLS), help = 'call functions to run. Default all')
+    parser.add_argument('--stores', nargs = '*', default = ['csv', 'xlsx', 'parquet', 'postgres'], help = 'store types to run')
+    parser.add_argument('--database', default = 'postgres')
+    parser.add_argument('--db-user', default = 'postgres')
+    parser.add_argument('--db-password', default = '')
+    parser.add_argument('--db-host', default = '')
+    parser.add_argument('--db-port', type = int, default = None)
+    parser.add_argument('--save', help = 'json file to save the results')
+    parser.add_argument('--baseline', help = 'json file of a previous run to compare with')
+    parser.add_argument('--tolerance', type = float, default = 0.1, help = 'accepted throughput loss or memory growth. Default 0.1')
+    args = parser.parse_args(argv)
+
+    rows_per_endpoint = {'time_balance_entries' : max(1, args.rows // args.employees)}
+    with MockServer(args.rows, args.latency, args.max_per_page, args.throttle, rows_per_endpoint = rows_per_endpoint) as server:
+        results = bench_calls(args, server)
+        results.update(bench_stores(args, server))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent = 2, sort_keys = True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print('\nRegressions: ' + ', '.join(regressions))
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#bibliotecas
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#optional backends that importing functions.Get must not load
+LAZY = ['sqlalchemy', 'psycopg2', 'MySQLdb', 'pyarrow', 'openpyxl', 'xlsxwriter']
+
+#runs in a fresh interpreter: time of the import and the lazy modules it loaded. pandas and requests, which
+#functions.Get needs anyway, are imported first so the modules they load themselves (e.g. pyarrow by pandas
+#when it is installed) are not blamed on functions.Get
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import pandas, requests
+required = [name for name in %r if name in sys.modules]
+import functions.Get
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds' : seconds, 'loaded' : [name for name in %r if name in sys.modules and name not in required]}))
+''' % (LAZY, LAZY)
+
+def cold_start(runs):
+    '''
+    Function to measure the import time of functions.Get in fresh interpreters
+
+    Args:
+        runs: number of interpreters started
+
+    Returns:
+        dict of the median seconds and the lazy modules loaded by the import
+    '''
+    times, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', SCRIPT], cwd = ROOT, check = True, capture_output = True, text = True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        loaded.update(result['loaded'])
+
+    return {'seconds' : statistics.median(times), 'loaded' : sorted(loaded)}
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Measure the cold start (import time) of functions.Get')
+    parser.add_argument('--runs', type = int, default = 10, help = 'fresh interpreters started. Default 10')
+    parser.add_argument('--budget', type = float, default = None, help = 'maximum median seconds accepted')
+    parser.add_argument('--save', help = 'json file to save the result')
+    parser.add_argument('--baseline', help = 'json file of a previous run to compare with')
+    parser.add_argument('--tolerance', type = float, default = 0.2, help = 'accepted import time growth. Default 0.2')
+    args = parser.parse_args(argv)
+
+    result = cold_start(args.runs)
+    print('import functions.Get {:>8.3f}s median of {} runs'.format(result['seconds'], args.runs))
+
+    failures = []
+    if result['loaded']:
+        failures.append('eagerly imported ' + ', '.join(result['loaded']))
+    if args.budget is not None and result['seconds'] > args.budget:
+        failures.append('over the {:.3f}s budget'.format(args.budget))
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['seconds']
+        print('compared with the baseline {:+.1%}'.format(result['seconds'] / baseline - 1))
+        if result['seconds'] > baseline * (1 + args.tolerance):
+            failures.append('slower than the baseline')
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(result, file, indent = 2, sort_keys = True)
+
+    if failures:
+        print('Regressions: ' + '; '.join(failures))
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#bibliotecas
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PREFIX = '/external_api/v1/'
+
+#json key of the list returned by each endpoint
+KEYS = {
+    'absences' : 'absences',
+    'allowances' : 'exemptions',
+    'business_units' : 'business_units',
+    'cities' : 'cities',
+    'cost_centers' : 'cost_centers',
+    'departments' : 'departments',
+    'employees' : 'employees',
+    'exemptions' : 'exemptions',
+    'holidays' : 'holidays',
+    'possible_leaders' : 'leaders',
+    'time_balance_entries' : 'time_balance_entries',
+    'users' : 'users',
+    'users/groups' : 'groups',
+}
+
+#endpoints called without page and per_page by Get
+NOT_PAGINATED = {'absences', 'allowances', 'cost_centers', 'departments', 'exemptions', 'users', 'users/groups'}
+
+#endpoints whose meta doesn't return the count
+NO_COUNT = {'business_units'}
+
+def record(endpoint, i, query):
+    '''
+    Function to build the i-th record of an endpoint, shaped like the Pontomais API response
+
+    Args:
+        endpoint: endpoint name
+        i: record index
+        query: dict of query string values of the request
+
+    Returns:
+        dict
+    '''
+    day = (date(2020, 1, 1) + timedelta(days = i % 1500)).isoformat()
+    team = {'id' : i % 40, 'name' : 'Team {}'.format(i % 40), 'leader_ids' : [i % 7, i % 11]}
+
+    if endpoint == 'employees':
+        return {'id' : i, 'first_name' : 'First{}'.format(i), 'last_name' : 'Last{}'.format(i), 'email' : 'employee{}@example.com'.format(i),
+                'pin' : i, 'is_clt' : i % 3 != 0, 'cpf' : '{:011d}'.format(i), 'nis' : '{:011d}'.format(i), 'registration_number' : str(i),
+                'time_card_source' : 'web', 'has_time_cards' : True, 'use_qrcode' : False, 'enable_geolocation' : False,
+                'work_hours' : '08:00', 'cost_center' : {'id' : i % 25, 'name' : 'Cost center {}'.format(i % 25)},
+                'user' : {'id' : 100000 + i, 'active' : i % 10 != 0, 'confirmed_at' : day + 'T08:00:00.000-03:00'},
+                'enable_offline_time_cards' : False, 'login' : 'employee{}'.format(i), 'updated_at' : day + 'T08:00:00.000-03:00'}
+    if endpoint == 'time_balance_entries':
+        return {'id' : i, 'date' : day, 'withdraw' : query.get('withdraw', 'false') == 'true', 'amount' : (i % 480) - 240,
+                'employee_id' : int(query.get('employee_id', 0)), 'observation' : 'Entry {}'.format(i), 'updated_by' : {'id' : i % 5}}
+    if endpoint in ('exemptions', 'allowances'):
+        return {'id' : i, 'start_date' : day, 'end_date' : day, 'observation' : 'Exemption {} \n'.format(i), 'medical_certificate' : query.get('medical_certificate') == 'true',
+                'employee' : {'id' : i % 2000}, 'answered_by' : {'id' : i % 9, 'team' : team}}
+    if endpoint == 'holidays':
+        return {'id' : i, 'name' : 'Holiday {}'.format(i), 'fixed' : True, 'date' : day, 'active' : True, 'team' : None,
+                'department' : None, 'business_unit' : None, 'cost_center' : None, 'shift' : None}
+    if endpoint == 'cities':
+        return {'id' : i, 'name' : 'City {}'.format(i), 'state' : 'PR'}
+    if endpoint == 'departments':
+        return {'id' : i, 'code' : str(i), 'name' : 'Department {}'.format(i), 'employees_count' : i % 50}
+    if endpoint == 'users':
+        return {'id' : i, 'group' : {'id' : i % 4, 'name' : 'Group {}'.format(i % 4)}, 'employee' : {'id' : i}, 'sign_in_count' : i % 100,
+                'last_sign_in_at' : day + 'T08:00:00.000-03:00', 'last_sign_in_ip' : '10.0.0.1', 'confirmed_at' : day + 'T08:00:00.000-03:00',
+                'active' : True, 'admin' : i % 20 == 0}
+    if endpoint == 'absences':
+        return {'id' : i, 'start_date' : day, 'end_date' : day, 'employee' : {'id' : i % 2000}, 'motive' : {'id' : i % 6, 'name' : 'Motive'}}
+
+    return {'id' : i, 'code' : str(i), 'name' : '{} {}'.format(endpoint, i)}
+
+class MockServer:
+    '''
+    Local stand-in of the Pontomais API used by the benchmarks. It serves the endpoints used by Get with
+    deterministic records, pagination meta, the employees active filter and updated_at sort, a simulated latency, a maximum page size, random HTTP 429 responses
+    and ETag revalidation
+
+    Args:
+        rows: number of records of each endpoint (per employee for time_balance_entries). Default = 1000
+        latency: seconds added to every response. Default = 0
+        max_per_page: largest per_page honoured, bigger values are capped. Default = 100
+        throttle: fraction of requests answered with HTTP 429. Default = 0
+        retry_after: Retry-After seconds sent with the 429 responses. Default = 0
+        rows_per_endpoint: dict of endpoint and rows overriding rows. Default None
+    '''
+
+    def __init__(self, rows = 1000, latency = 0, max_per_page = 100, throttle = 0, retry_after = 0, rows_per_endpoint = None):
+        self.rows = rows
+        self.latency = latency
+        self.max_per_page = max_per_page
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.rows_per_endpoint = rows_per_endpoint or {}
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}{}'.format(self._server.server_address[1], PREFIX)
+
+    def start(self):
+        '''
+        Function to start serving on a free local port in a background thread
+
+        Args:
+            None
+
+        Returns:
+            MockServer
+        '''
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                status, headers, body = mock.respond(self.path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        '''
+        Function to stop the server
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def respond(self, path, headers):
+        '''
+        Function to build the response of a request
+
+        Args:
+            path: request path with the query string
+            headers: request headers
+
+        Returns:
+            tuple of status, dict of headers and body bytes
+        '''
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests += 1
+            throttled = self._random.random() < self.throttle
+            if throttled:
+                self.throttled += 1
+
+        if throttled:
+            return 429, {'Retry-After' : str(self.retry_after), 'Content-Type' : 'application/json'}, b'{"error":"Too Many Requests"}'
+
+        parts = urlsplit(path)
+        endpoint = parts.path[len(PREFIX):] if parts.path.startswith(PREFIX) else ''
+        if endpoint not in KEYS:
+            return 404, {'Content-Type' : 'application/json'}, b'{"error":"Not Found"}'
+
+        query = {name : values[-1] for name, values in parse_qs(parts.query).items()}
+        total = int(self.rows_per_endpoint.get(endpoint, self.rows))
+
+        indexes = range(total)
+        if endpoint == 'employees' and 'active' in query:
+            #every tenth employee is inactive
+            indexes = [i for i in indexes if (i % 10 != 0) == (query['active'] == 'true')]
+        if query.get('sort_property') == 'updated_at':
+            indexes = sorted(indexes, key = lambda i: i % 1500, reverse = query.get('sort_direction') == 'desc')
+
+        if endpoint in NOT_PAGINATED:
+            first, last = 0, len(indexes)
+        else:
+            per_page = min(int(query.get('per_page', 100)), self.max_per_page)
+            first = (int(query.get('page', 1)) - 1) * per_page
+            last = min(len(indexes), first + per_page)
+
+        payload = {KEYS[endpoint] : [record(endpoint, indexes[i], query) for i in range(first, last)]}
+        if query.get('count') == 'true' and endpoint not in NO_COUNT:
+            payload['meta'] = {'count' : len(indexes)}
+
+        body = json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if headers.get('If-None-Match') == etag:
+            return 304, {'ETag' : etag}, b''
+
+        return 200, {'Content-Type' : 'application/json', 'ETag' : etag}, body
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description = 'Serve a local stand-in of the Pontomais API')
+    parser.add_argument('--rows', type = int, default = 1000)
+    parser.add_argument('--latency', type = float, default = 0)
+    parser.add_argument('--max-per-page', type = int, default = 100)
+    parser.add_argument('--throttle', type = float, default = 0)
+    args = parser.parse_args()
+
+    with MockServer(args.rows, args.latency, args.max_per_page, args.throttle) as server:
+        print('Serving on ' + server.base_url)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,503 @@
+#bibliotecas
+import asyncio
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functions.Get import Get, _import, _loads
+
+logger = logging.getLogger(__name__)
+
+class AsyncGet(Get):
+    '''
+    Asyncio counterpart of the Get class: every call_* function and run_all are awaitable. The API requests run
+    on the event loop through a pooled aiohttp session, so many pages are in flight cooperatively in one
+    process, while the parsing and _store of each call run on a worker thread and never block the loop. Use
+    one event loop per instance
+
+    Args:
+        token: authentication token. Default = ''
+        store_type: None, csv, xlsx, parquet, arrow, postgres, mysql. Default = None
+        store_mode: trunc, create. Default = trunc
+
+    Other Atributes:
+        max_in_flight: maximum pages requested ahead of the ones already parsed by a call. Default = 100
+        client: aiohttp session shared by every request, created on the first request. Its connection pool is
+            limited to max_concurrency, which also bounds the requests in flight through the rate limiter
+        max_calls: maximum call functions running their parsing and _store at once, on a thread pool of the
+            instance apart from the loop default executor used by the short cache, checkpoint and state reads
+            of the requests. Default = 16
+        every other attribute of the Get class
+
+    Call aclose() or use the instance as an async context manager to release the session and engines
+    '''
+
+    def __init__(self, token = '', store_type = None, store_mode = 'trunc'):
+        super().__init__(token, store_type, store_mode)
+        self.max_in_flight = 100
+        self.client = None
+        self._loop = None
+        self._loop_thread = None
+        self._released = None
+        self.max_calls = 16
+        self._executor = None
+
+    async def aclose(self):
+        '''
+        Function to close the aiohttp session, the requests session and dispose the database engines
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+        await asyncio.to_thread(self.close)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait = False)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    def _get_client(self):
+        '''
+        Function to return the aiohttp session, creating it with a keep-alive connection pool on the first call
+
+        Args:
+            None
+
+        Returns:
+            aiohttp.ClientSession
+        '''
+        if self.client is None:
+            aiohttp = _import('aiohttp')
+            self.client = aiohttp.ClientSession(connector = aiohttp.TCPConnector(limit = self.max_concurrency),
+                                                timeout = aiohttp.ClientTimeout(total = self.timeout))
+
+        return self.client
+
+    async def _run(self, method, *args, **kwargs):
+        '''
+        Function to run a blocking Get function on a thread of the instance pool, with its requests sent from
+        the event loop. The function blocks its thread while its requests run, so the pool is kept apart from
+        the default executor the requests use for their own blocking reads, which could otherwise wait on a
+        thread held by the function waiting on them
+
+        Args:
+            method: Get function
+            args, kwargs: arguments of the function
+
+        Returns:
+            the function return
+        '''
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._loop_thread = threading.get_ident()
+        elif self._loop is not loop:
+            raise RuntimeError('AsyncGet instance used from a different event loop')
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers = self.max_calls, thread_name_prefix = 'AsyncGet')
+
+        return await loop.run_in_executor(self._executor, functools.partial(method, self, *args, **kwargs))
+
+    def _bridge(self, pages):
+        '''
+        Generator yielding, on the worker thread running a call function, the items of an async generator
+        running on the event loop. Closing it cancels the requests still in flight
+
+        Args:
+            pages: async generator
+
+        Returns:
+            generator
+        '''
+        if self._loop is None or threading.get_ident() == self._loop_thread:
+            raise RuntimeError('AsyncGet call functions must be awaited')
+
+        try:
+            while True:
+                try:
+                    item = asyncio.run_coroutine_threadsafe(pages.__anext__(), self._loop).result()
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            #a generator left unfinished may be finalized by the garbage collector on the loop thread itself
+            if not self._loop.is_closed():
+                closing = asyncio.run_coroutine_threadsafe(pages.aclose(), self._loop)
+                if threading.get_ident() != self._loop_thread:
+                    closing.result()
+
+    async def _acquire(self):
+        '''
+        Function to wait, without blocking the event loop, until the rate limiter lets a request through and
+        take a token and a concurrency slot. While every slot is taken it waits for the next release, signalled
+        through the rate limiter listeners, otherwise it sleeps the time the limiter asks for
+
+        Args:
+            None
+
+        Returns:
+            RateLimiter
+        '''
+        rate_limiter = self._get_rate_limiter()
+        if self._released is None:
+            loop = asyncio.get_running_loop()
+            self._released = asyncio.Event()
+
+            def listener():
+                #releases also come from the worker threads running the blocking requests
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._released.set)
+
+            rate_limiter.listeners.append(listener)
+
+        while True:
+            #cleared before trying, so a release right after the try still wakes this request
+            self._released.clear()
+            wait = rate_limiter.try_acquire()
+            if wait == 0:
+                return rate_limiter
+            elif wait is None:
+                await self._released.wait()
+            else:
+                await asyncio.sleep(wait)
+
+    async def _send_async(self, url, headers = None):
+        '''
+        Function to send a get request through the rate limiter, with the retries of Get._send
+
+        Args:
+            url: full url passed to the API
+            headers: extra headers of the request. Default None
+
+        Returns:
+            tuple of aiohttp.ClientResponse and body bytes
+        '''
+        aiohttp = _import('aiohttp')
+        client = self._get_client()
+
+        for attempt in range(self.max_retries + 1):
+            backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+            rate_limiter = await self._acquire()
+            start = time.perf_counter()
+            try:
+                async with client.get(url, headers = dict(self.header, **(headers or {}))) as response:
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                rate_limiter.release()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning('--------Connection error on {}, retry in {:.1f}s--------'.format(url, backoff))
+                await asyncio.sleep(backoff)
+                continue
+            except BaseException:
+                #prefetched pages are cancelled mid-request when their call stops early
+                rate_limiter.release()
+                raise
+
+            retry = response.status == 429 or response.status >= 500
+            self._emit('request', self._endpoint(url), requests = 1, request_seconds = time.perf_counter() - start,
+                       bytes = len(body), retries = int(retry), url = url, status = response.status)
+
+            if not retry:
+                rate_limiter.release()
+                return response, body
+
+            retry_after = self._retry_after(response)
+            rate_limiter.release(throttled = response.status == 429, retry_after = retry_after)
+            if attempt == self.max_retries:
+                response.raise_for_status()
+
+            wait = retry_after if retry_after is not None else backoff
+            logger.warning('--------HTTP {} on {}, retry in {:.1f}s--------'.format(response.status, url, wait))
+            await asyncio.sleep(wait)
+
+    async def _request_async(self, url):
+        '''
+        Function to call the API through _request_json_async, with the checkpoint of Get._request
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            dict
+        '''
+        if not self.checkpoint_path:
+            return await self._request_json_async(url)
+
+        key, replayed = await asyncio.to_thread(self._checkpoint_unit, url)
+        if replayed is not None:
+            return replayed
+
+        r = await self._request_json_async(url)
+        r['_checkpoint'] = key
+
+        return r
+
+    async def _request_json_async(self, url):
+        '''
+        Function to call the API and return the parsed json, with the response cache of Get._request_json
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            dict
+        '''
+        endpoint = self._endpoint(url)
+        if not self.cache_path or endpoint not in self.cache_ttl:
+            response, body = await self._send_async(url)
+            response.raise_for_status()
+            return _loads(body)
+
+        cache = self._get_cache()
+        key = cache.key(url, self.token)
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry is not None and time.time() - entry['stored_at'] < self.cache_ttl[endpoint]:
+            self._emit('cache', endpoint, cached = 1, url = url)
+            return _loads(entry['body'])
+
+        headers = {}
+        if entry is not None and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response, body = await self._send_async(url, headers)
+        if response.status == 304 and entry is not None:
+            self._emit('cache', endpoint, cached = 1, url = url)
+            await asyncio.to_thread(cache.touch, key)
+            return _loads(entry['body'])
+
+        response.raise_for_status()
+        await asyncio.to_thread(cache.set, key, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+        return _loads(body)
+
+    async def _pages_async(self, url_base, key, per_page):
+        '''
+        Async generator counterpart of Get._fetch_pages: after the first page, up to max_in_flight pages are
+        requested at once when the total count is known, otherwise max_workers pages speculatively. Pages are
+        yielded in order and the requests still in flight are cancelled when it is closed
+
+        Args:
+            url_base: url ending with '?' or '&' to which page and per_page are appended
+            key: json key holding the list of elements
+            per_page: number of elements per page
+
+        Returns:
+            async generator of dict
+        '''
+        def page_url(page, size):
+            return url_base + 'page=' + str(page) + '&' + 'per_page=' + str(size)
+
+        r = await self._request_async(page_url(1, per_page))
+        yield r
+        size, last_page = self._plan_pages(url_base, r, key, per_page)
+        if last_page == 1:
+            return
+
+        #with the total count up to max_in_flight pages are requested ahead, otherwise max_workers speculatively
+        window = self.max_workers if last_page is None else self.max_in_flight
+
+        next_page = 2
+        tasks = deque()
+        try:
+            while True:
+                while len(tasks) < window and (last_page is None or next_page <= last_page):
+                    tasks.append(asyncio.ensure_future(self._request_async(page_url(next_page, size))))
+                    next_page += 1
+
+                if not tasks:
+                    break
+
+                page = next_page - len(tasks)
+                r = await tasks.popleft()
+                if page == 2 and size < per_page and r[key]:
+                    await asyncio.to_thread(self._learn_per_page, url_base, size)
+                yield r
+                if last_page is None and len(r[key]) < size:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _many_async(self, url_bases, key, per_page, max_workers, labels):
+        '''
+        Async generator counterpart of Get._fetch_many: the pages of every call are scheduled as tasks, at most
+        max_workers (or max_in_flight) calls open and requested at once, and yielded in url_bases order and,
+        inside each call, in page order
+
+        Args:
+            url_bases: list of urls ending with '?' or '&' to which page and per_page are appended
+            key: json key holding the list of elements
+            per_page: number of elements per page
+            max_workers: maximum number of concurrent requests, None for max_in_flight
+            labels: list of labels printed for each url
+
+        Returns:
+            async generator of dict
+        '''
+        workers = max_workers or self.max_in_flight
+        semaphore = asyncio.Semaphore(workers)
+
+        async def fetch(unit, page):
+            async with semaphore:
+                logger.debug('--------{} Page {}--------'.format(labels[unit], page))
+                url = url_bases[unit] + 'page=' + str(page) + '&' + 'per_page=' + str(sizes[unit])
+                return unit, page, await self._request_async(url)
+
+        results = [{} for _ in url_bases]
+        outstanding = [1 for _ in url_bases]
+        sizes = [per_page for _ in url_bases]
+        last_pages = [None for _ in url_bases]
+        next_unit = 0
+        next_admit = 0
+
+        pending = set()
+        try:
+            while next_admit < len(url_bases) and next_admit - next_unit < workers:
+                pending.add(asyncio.ensure_future(fetch(next_admit, 1)))
+                next_admit += 1
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    unit, page, r = task.result()
+                    results[unit][page] = r
+                    outstanding[unit] -= 1
+
+                    if page == 1:
+                        sizes[unit], last_pages[unit] = self._plan_pages(url_bases[unit], r, key, per_page)
+                        for next_page in range(2, (last_pages[unit] or 1) + 1):
+                            pending.add(asyncio.ensure_future(fetch(unit, next_page)))
+                            outstanding[unit] += 1
+                    elif page == 2 and sizes[unit] < per_page and r[key]:
+                        await asyncio.to_thread(self._learn_per_page, url_bases[unit], sizes[unit])
+
+                    if last_pages[unit] is None and len(r[key]) == sizes[unit]:
+                        pending.add(asyncio.ensure_future(fetch(unit, page + 1)))
+                        outstanding[unit] += 1
+
+                while next_unit < len(url_bases) and outstanding[next_unit] == 0:
+                    for page in sorted(results[next_unit]):
+                        yield results[next_unit][page]
+                    results[next_unit] = None
+                    next_unit += 1
+
+                while next_admit < len(url_bases) and next_admit - next_unit < workers:
+                    pending.add(asyncio.ensure_future(fetch(next_admit, 1)))
+                    next_admit += 1
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _windows_async(self, urls):
+        '''
+        Async generator counterpart of Get._fetch_windows, requesting up to max_in_flight windows at once and
+        yielding them in order
+
+        Args:
+            urls: list of full urls of the windows
+
+        Returns:
+            async generator of dict
+        '''
+        tasks = deque()
+        try:
+            for url in urls:
+                tasks.append(asyncio.ensure_future(self._request_async(url)))
+                if len(tasks) >= self.max_in_flight:
+                    yield await tasks.popleft()
+
+            while tasks:
+                yield await tasks.popleft()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _one_async(self, url):
+        '''
+        Async generator counterpart of Get._fetch_one, requesting a call that is not paginated
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            async generator of dict
+        '''
+        yield await self._request_async(url)
+
+    def _fetch_pages(self, url_base, key, per_page = 100):
+        return self._bridge(self._pages_async(url_base, key, per_page))
+
+    def _fetch_many(self, url_bases, key, per_page = 100, max_workers = None, labels = None):
+        if labels is None:
+            labels = [str(unit) for unit in range(len(url_bases))]
+
+        return self._bridge(self._many_async(url_bases, key, per_page, max_workers, labels))
+
+    def _fetch_windows(self, url_base, start_date, end_date, medical_certificate):
+        urls = [url_base + 'start_date=' + window_start + '&' + 'end_date=' + window_end + '&' + 'medical_certificate=' + str(certificate)
+                for certificate in medical_certificate for window_start, window_end in self._date_windows(start_date, end_date)]
+
+        return self._bridge(self._windows_async(urls))
+
+    def _fetch_one(self, url):
+        return self._bridge(self._one_async(url))
+
+    def _job_method(self, method):
+        #run_all jobs already run on worker threads, so they run the blocking call functions
+        return functools.partial(getattr(Get, method), self)
+
+    async def employees(self, active = True, cost_center_id = None, shard = None):
+        '''
+        Awaitable Get.employees
+
+        Args:
+            active, cost_center_id, shard: as in Get.employees
+
+        Returns:
+            list of int sorted
+        '''
+        return await self._run(Get._employee_ids, active, cost_center_id, shard)
+
+    async def run_all(self, jobs, max_workers = None):
+        '''
+        Awaitable Get.run_all
+
+        Args:
+            jobs: list of jobs as documented in Get.run_all
+            max_workers: maximum number of jobs running at once. Default None (all jobs)
+
+        Returns:
+            DataFrame with the name, method, status, rows, seconds and error of each job
+        '''
+        return await self._run(Get.run_all, jobs, max_workers)
+
+def _awaitable(method):
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        return await self._run(method, *args, **kwargs)
+
+    return call
+
+#awaitable version of every call function of Get, sharing its parsing and store logic
+for _name in dir(Get):
+    if _name.startswith('call_'):
+        setattr(AsyncGet, _name, _awaitable(getattr(Get, _name)))
@@ -0,0 +1,126 @@
+#bibliotecas
+import hashlib
+import json
+import os
+import shutil
+import time
+import pandas as pd
+
+class Checkpoint:
+    '''
+    Spill directory keeping the pages of the calls that didn't finish. Each unit is one API request (endpoint,
+    parameters and page, as in its url): once fetched and parsed, its dataframe is pickled with the list sizes
+    and meta of the response, so a rerun of the same call reads it back instead of requesting the page again.
+    Units are removed when the call storing them finishes, or dropped when older than ttl, so a call rerun long
+    after it failed requests the data again. Only point it to a directory written by this package, the
+    dataframes are read back with pickle
+
+    Args:
+        path: spill directory, created when missing
+        ttl: maximum age in seconds of a unit read back. Default None (units never expire)
+    '''
+
+    def __init__(self, path, ttl = None):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok = True)
+
+    @staticmethod
+    def key(url, token):
+        '''
+        Function to build the unit key of a request. The token is hashed so it is not written to disk
+
+        Args:
+            url: full url passed to the API
+            token: authentication token
+
+        Returns:
+            str
+        '''
+        return hashlib.sha256((token + ' ' + url).encode('utf-8')).hexdigest()
+
+    def _file(self, key, extension):
+        return os.path.join(self.path, key + extension)
+
+    def get(self, key):
+        '''
+        Function to read the response summary of a completed unit. A unit older than ttl is removed
+
+        Args:
+            key: unit key
+
+        Returns:
+            dict with the sizes of the response lists and its meta or None when the unit is not complete or expired
+        '''
+        try:
+            if self.ttl and time.time() - os.path.getmtime(self._file(key, '.json')) > self.ttl:
+                self.remove([key])
+                return None
+            with open(self._file(key, '.json')) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key):
+        '''
+        Function to read the dataframe of a completed unit
+
+        Args:
+            key: unit key
+
+        Returns:
+            DataFrame
+        '''
+        return pd.read_pickle(self._file(key, '.pkl'))
+
+    def save(self, key, df, response):
+        '''
+        Function to persist a parsed unit. The summary is written last, so a unit is only complete once both
+        files are in place
+
+        Args:
+            key: unit key
+            df: dataframe parsed from the response
+            response: API response of the unit
+
+        Returns:
+            None
+        '''
+        df.to_pickle(self._file(key, '.pkl.tmp'))
+        os.replace(self._file(key, '.pkl.tmp'), self._file(key, '.pkl'))
+
+        summary = {'lists' : {name : len(value) for name, value in response.items() if isinstance(value, list)},
+                   'meta' : response.get('meta')}
+        with open(self._file(key, '.json.tmp'), 'w') as file:
+            json.dump(summary, file)
+        os.replace(self._file(key, '.json.tmp'), self._file(key, '.json'))
+
+    def remove(self, keys):
+        '''
+        Function to remove units
+
+        Args:
+            keys: list of unit keys
+
+        Returns:
+            None
+        '''
+        for key in keys:
+            for extension in ('.json', '.pkl'):
+                try:
+                    os.remove(self._file(key, extension))
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        '''
+        Function to remove every unit
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        shutil.rmtree(self.path, ignore_errors = True)
+        os.makedirs(self.path, exist_ok = True)
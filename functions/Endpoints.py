@@ -0,0 +1,93 @@
+#per-endpoint settings of the Pontomais API used by the Get class
+#endpoints are named after the API path that follows /external_api/v1/
+
+#column types of the parquet and arrow store types: int64, float64, string, bool, date32 or timestamp.
+#columns not listed are inferred
+SCHEMAS = {
+    'absences' : {'id' : 'int64'},
+    'allowances' : {'id' : 'int64', 'start_date' : 'date32', 'end_date' : 'date32', 'observation' : 'string',
+                    'answered_by.team.leader_ids' : 'string'},
+    'business_units' : {'id' : 'int64', 'code' : 'string', 'name' : 'string'},
+    'cities' : {'id' : 'int64', 'name' : 'string'},
+    'cost_centers' : {'id' : 'int64', 'code' : 'string', 'name' : 'string'},
+    'departments' : {'id' : 'int64', 'code' : 'string', 'name' : 'string', 'employees_count' : 'int64'},
+    'employees' : {'id' : 'int64', 'first_name' : 'string', 'last_name' : 'string', 'email' : 'string', 'is_clt' : 'bool',
+                   'user_id' : 'int64', 'active' : 'bool', 'confirmed_at' : 'timestamp', 'full_name' : 'string'},
+    'exemptions' : {'id' : 'int64', 'start_date' : 'date32', 'end_date' : 'date32', 'observation' : 'string',
+                    'answered_by.team.leader_ids' : 'string'},
+    'holidays' : {'id' : 'int64', 'name' : 'string', 'date' : 'date32'},
+    'possible_leaders' : {'id' : 'int64', 'name' : 'string'},
+    'time_balance_entries' : {'id' : 'int64', 'date' : 'date32', 'withdraw' : 'bool', 'amount' : 'float64', 'employee_id' : 'int64',
+                              'observation' : 'string'},
+    'users' : {'id' : 'int64', 'sign_in_count' : 'int64', 'last_sign_in_at' : 'timestamp', 'confirmed_at' : 'timestamp',
+               'active' : 'bool', 'admin' : 'bool'},
+    'users/groups' : {'id' : 'int64', 'name' : 'string'},
+}
+
+#date column used to partition the parquet store type by month
+PARTITION_DATES = {
+    'allowances' : 'start_date',
+    'exemptions' : 'start_date',
+    'time_balance_entries' : 'date',
+}
+
+#columns decoded by Get._decode from each record of the endpoints projected by the call functions, as tuples of
+#column name, json path and type (int64, float64, bool, string or object to keep the json value as returned).
+#the attributes= projection sent to the API is built from the first key of each path
+FIELDS = {
+    'cities' : [('id', 'id', 'int64'), ('name', 'name', 'string'), ('state', 'state', 'object')],
+    'cost_centers' : [('id', 'id', 'int64'), ('code', 'code', 'string'), ('name', 'name', 'string')],
+    'departments' : [('id', 'id', 'int64'), ('code', 'code', 'string'), ('name', 'name', 'string'),
+                     ('employees_count', 'employees_count', 'int64')],
+    'employees' : [('id', 'id', 'int64'), ('first_name', 'first_name', 'string'), ('last_name', 'last_name', 'string'),
+                   ('email', 'email', 'string'), ('is_clt', 'is_clt', 'bool'), ('user_id', 'user.id', 'int64'),
+                   ('active', 'user.active', 'bool'), ('confirmed_at', 'user.confirmed_at', 'string')],
+    'holidays' : [('id', 'id', 'int64'), ('name', 'name', 'string'), ('date', 'date', 'string'), ('team', 'team', 'object'),
+                  ('department', 'department', 'object'), ('business_unit', 'business_unit', 'object'),
+                  ('cost_center', 'cost_center', 'object')],
+    'business_units' : [('id', 'id', 'int64'), ('code', 'code', 'string'), ('name', 'name', 'string')],
+    'possible_leaders' : [('id', 'id', 'int64'), ('name', 'name', 'string')],
+    'time_balance_entries' : [('id', 'id', 'int64'), ('date', 'date', 'string'), ('withdraw', 'withdraw', 'bool'),
+                              ('amount', 'amount', 'object'), ('employee_id', 'employee_id', 'int64'),
+                              ('observation', 'observation', 'string'), ('updated_by.id', 'updated_by.id', 'int64'),
+                              ('updated_by.name', 'updated_by.name', 'string')],
+    'users/groups' : [('id', 'id', 'int64'), ('name', 'name', 'string')],
+}
+
+#compact dtypes applied by Get._compact when Get.compact is set, as column and type: integer (downcast to the
+#smallest integer, nullable when values are missing), float (downcast), date, timestamp (naive UTC), boolean
+#(nullable) or category (only when at most half of the values are distinct). Columns not listed are kept as returned
+DTYPES = {
+    'absences' : {'id' : 'integer', 'start_date' : 'date', 'end_date' : 'date', 'employee.id' : 'integer'},
+    'allowances' : {'id' : 'integer', 'start_date' : 'date', 'end_date' : 'date', 'medical_certificate' : 'boolean',
+                    'employee.id' : 'integer', 'answered_by.id' : 'integer', 'answered_by.team.id' : 'integer',
+                    'answered_by.team.name' : 'category', 'answered_by.team.leader_ids' : 'category'},
+    'business_units' : {'id' : 'integer'},
+    'cities' : {'id' : 'integer', 'state' : 'category'},
+    'cost_centers' : {'id' : 'integer'},
+    'departments' : {'id' : 'integer', 'employees_count' : 'integer'},
+    'employees' : {'id' : 'integer', 'is_clt' : 'boolean', 'user_id' : 'integer', 'active' : 'boolean', 'confirmed_at' : 'timestamp'},
+    'exemptions' : {'id' : 'integer', 'start_date' : 'date', 'end_date' : 'date', 'medical_certificate' : 'boolean',
+                    'employee.id' : 'integer', 'answered_by.id' : 'integer', 'answered_by.team.id' : 'integer',
+                    'answered_by.team.name' : 'category', 'answered_by.team.leader_ids' : 'category'},
+    'holidays' : {'id' : 'integer', 'date' : 'date'},
+    'possible_leaders' : {'id' : 'integer'},
+    'time_balance_entries' : {'id' : 'integer', 'date' : 'date', 'withdraw' : 'boolean', 'employee_id' : 'integer',
+                              'updated_by.id' : 'integer', 'updated_by.name' : 'category', 'observation' : 'category'},
+    'users' : {'id' : 'integer', 'group.id' : 'integer', 'group.name' : 'category', 'employee.id' : 'integer',
+               'sign_in_count' : 'integer', 'last_sign_in_at' : 'timestamp', 'confirmed_at' : 'timestamp', 'active' : 'boolean',
+               'admin' : 'boolean', 'last_sign_in_ip' : 'category'},
+    'users/groups' : {'id' : 'integer'},
+}
+
+#page size requested on the first page of each paginated endpoint by Get._per_page. The API caps per_page
+#without an error, so the size of the next pages is planned from the first page and kept in the sync state
+#store. Endpoints not listed are requested with per_page = 100
+PER_PAGE = {
+    'business_units' : 1000,
+    'cities' : 1000,
+    'employees' : 1000,
+    'holidays' : 1000,
+    'possible_leaders' : 1000,
+    'time_balance_entries' : 1000,
+}
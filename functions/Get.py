@@ -1,14 +1,73 @@
 #bibliotecas
-import numpy as np
 import pandas as pd
 import json
 import requests
-from datetime import date
-import psycopg2
-import sqlalchemy
-from sqlalchemy import create_engine
+from requests.adapters import HTTPAdapter
+from datetime import date, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import math
 import io
+import os
+import logging
+import csv
+import tempfile
 import sys
+import time
+import random
+import shutil
+import hashlib
+import importlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from functions import Endpoints
+from functions.ResponseCache import ResponseCache
+from functions.RateLimiter import RateLimiter
+from functions.Checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+#pip extra of the package installing each optional backend module, imported on its first use by _import
+EXTRAS = {
+    'sqlalchemy' : 'postgres',
+    'psycopg2' : 'postgres',
+    'MySQLdb' : 'mysql',
+    'pyarrow' : 'parquet',
+    'pyarrow.parquet' : 'parquet',
+    'pyarrow.feather' : 'parquet',
+    'aiohttp' : 'async',
+    'xlsxwriter' : 'xlsx',
+}
+
+def _import(name, extra = None):
+    '''
+    Function to import an optional backend module, so the database, file and async libraries are only loaded
+    by the features using them
+
+    Args:
+        name: module name
+        extra: pip extra installing the module. Default None (taken from EXTRAS)
+
+    Returns:
+        module
+    '''
+    try:
+        return importlib.import_module(name)
+    except ImportError as error:
+        raise ImportError(name + ' is not installed, install it with pip install pontomais-functions['
+                          + (extra or EXTRAS.get(name, 'all')) + ']') from error
+
+#orjson decodes the API responses faster when it is installed
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+#statistics summed per endpoint by the instrumentation
+STATS = ['calls', 'seconds', 'requests', 'request_seconds', 'bytes', 'retries', 'cached', 'pages', 'rows',
+         'normalize_seconds', 'store_seconds', 'memory_saved']
 
 class Get:
     '''
@@ -16,131 +75,1920 @@ class Get:
 
     Args:
         token: authentication token. Default = ''
-        store_type: None, csv, xlsx, postgres, mysql. Default = None
-        store_mode: trunc, create. Default = trunc
+        store_type: None, csv, xlsx, parquet, arrow, postgres, mysql. Default = None
+        store_mode: trunc, create, diff (only the rows changed since the last store are written, see _store_diff),
+            swap (postgres: load a staging table and rename it into place, see _swap). Default = trunc
 
     Other Atributes:
         header: header passed to the API
+        base_url: url of the API the endpoints are appended to. Default = https://api.pontomais.com.br/external_api/v1/
+        max_workers: number of pages fetched concurrently on paginated calls. Default = 8
+        session: keep-alive requests session shared by every call, created on the first request
+        pool_connections: number of host connection pools kept by the session. Default = 10
+        pool_maxsize: maximum connections kept alive per host. Default = 16
+        timeout: seconds to wait for the API before failing a request. Default = 60
+        rate_limit: starting requests per second sent to the API, grown until the API throttles and lowered
+            while it does, or None for no rate limit until the first throttled response. Default = 10
+        rate_burst: requests sent at once after an idle period. Default = 10
+        max_concurrency: maximum concurrent requests of the instance, lowered while the API throttles. Default = 16
+        max_retries: retries of a request that got HTTP 429, 5xx or a connection error. Default = 5
+        backoff_base: seconds of the first retry backoff, doubled on each retry with jitter. Default = 1
+        backoff_max: maximum seconds of a retry backoff. Default = 60
+        cache_path: sqlite file caching the responses of the endpoints in cache_ttl. Default = '' (no cache)
+        cache_ttl: dict of endpoint and seconds a cached response is used without calling the API
+        cache_max_entries: maximum number of cached responses, least recently used are evicted. Default = 1000
+        checkpoint_path: spill directory keeping the parsed pages of unfinished calls, so a rerun with the same
+            parameters resumes instead of requesting them again. Default = '' (no checkpoint)
+        checkpoint_ttl: maximum age in seconds of a checkpoint unit resumed, older units are requested again.
+            Default = 86400 (None for no expiry)
+        date_window: split the date range of call_abonos and call_excecoes_jornada into windows of this many
+            days, or 'month' for calendar months, fetched concurrently. Default = None (one call per range)
+        hooks: list of functions called as hook(event, values) on every request, cache, page, compact, diff, store and call event
+        stats: dict of endpoint and the STATS summed since the instance was created, see summary()
+        stream: store each page as soon as it is parsed instead of the whole result (csv, postgres and mysql). Default = False
         local_path: path to store the returned files
+        fields: dict of endpoint and columns decoded from the API records. Default = Endpoints.FIELDS
+        schemas: dict of endpoint and column types of the parquet and arrow files. Default = Endpoints.SCHEMAS
+        per_page: dict of endpoint and largest page size tried, the size the API accepts is discovered on the
+            first call and kept in the sync state store. Default = Endpoints.PER_PAGE
+        compact: boolean to convert the returned dataframes to the compact dtypes in dtypes. Default = False
+        dtypes: dict of endpoint and compact column dtypes. Default = Endpoints.DTYPES
+        compression: compression codec of the parquet and arrow files. Default = zstd
+        xlsx_stream: boolean to write the xlsx files row by row with xlsxwriter in constant memory instead of
+            DataFrame.to_excel. Default = False
+        workbook: name of a workbook collecting every xlsx store of the instance as a sheet named after the
+            store_name, written row by row to local_path/workbook.xlsx when the instance is closed. Default = '' (one file per store)
+        partition: boolean to partition the parquet files of the endpoints in Endpoints.PARTITION_DATES by month. Default = False
         database: database name
         db_user: database user
         db_password: database user password
         db_host: database host
         db_port: database port
+        db_pool_size: connections kept open by the database engine. Default = 5
+        db_max_overflow: connections opened above db_pool_size on peaks. Default = 10
+        db_pool_recycle: seconds before a pooled connection is replaced. Default = 3600
+        mysql_load: insert (batched multi-row inserts) or infile (LOAD DATA LOCAL INFILE, needs local_infile enabled on
+            the server, off by default since MySQL 8). Default = insert
+        mysql_batch_size: rows per multi-row insert when mysql_load = insert. Default = 5000
+        state_path: json file keeping the incremental sync state of file stores. Default = '' (local_path/pontomais_state.json)
+        employee_index_path: json file keeping the employee index used by employees(). Default = ''
+            (local_path/pontomais_employees_<token hash>.json)
+        employee_index_ttl: seconds the employee index is used before the employees updated since are fetched. Default = 3600
+        employee_index_rebuild: seconds before the employee index is rebuilt from every employee, dropping the
+            deleted ones. Default = 604800 (7 days)
+        state_table: control table keeping the incremental sync state of postgres/mysql stores. Default = pontomais_sync_state
+        diff_key: column identifying the rows when store_mode = diff. Default = id
+        swap_lock_timeout: seconds the rename of store_mode = swap waits for the readers of the table before
+            the load is rolled back. Default = 10
+
+    The database engine and the API session are kept for the instance lifetime. Call close() or use the
+    instance as a context manager to release them
     '''
 
     def __init__(self, token = '', store_type = None, store_mode = 'trunc'):
         #API basic call attributes
         self.token = token
         self.header = {'access-token' : token}
+        self.base_url = 'https://api.pontomais.com.br/external_api/v1/'
+        self.max_workers = 8
+        self.session = None
+        self.pool_connections = 10
+        self.pool_maxsize = 16
+        self.timeout = 60
+        self.rate_limit = 10
+        self.rate_burst = 10
+        self.max_concurrency = 16
+        self.max_retries = 5
+        self.backoff_base = 1
+        self.backoff_max = 60
+        self._rate_limiter = None
+        self.hooks = []
+        self.stats = {}
+        self._lock = threading.Lock()
+        self.cache_path = ''
+        self.cache_ttl = {'cities' : 7 * 86400, 'departments' : 86400, 'cost_centers' : 86400, 'users/groups' : 86400,
+                          'business_units' : 86400}
+        self.cache_max_entries = 1000
+        self._cache = None
+        self.checkpoint_path = ''
+        self.checkpoint_ttl = 86400
+        self._checkpoint = None
 
         #store attributes
         self.store_type = store_type
         self.store_mode = store_mode
+        self.stream = False
+        self.date_window = None
         self.local_path = ''
+        self.fields = dict(Endpoints.FIELDS)
+        self.schemas = dict(Endpoints.SCHEMAS)
+        self.per_page = dict(Endpoints.PER_PAGE)
+        self._page_sizes = {}
+        self.compact = False
+        self.dtypes = dict(Endpoints.DTYPES)
+        self.compression = 'zstd'
+        self.xlsx_stream = False
+        self.workbook = ''
+        self._workbooks = {}
+        self._xlsx_lock = threading.Lock()
+        self.partition = False
         self.database = ''
         self.db_user = ''
         self.db_password = ''
         self.db_host = ''
         self.db_port = ''
+        self.db_pool_size = 5
+        self.db_max_overflow = 10
+        self.db_pool_recycle = 3600
+        self.mysql_load = 'insert'
+        self.mysql_batch_size = 5000
+        self._engines = {}
+        self.state_path = ''
+        self.employee_index_path = ''
+        self.employee_index_ttl = 3600
+        self.employee_index_rebuild = 7 * 86400
+        self._employee_index = {}
+        self._employee_lock = threading.Lock()
+        self.state_table = 'pontomais_sync_state'
+        self.diff_key = 'id'
+        self.swap_lock_timeout = 10
+
+    def set_token(self, token):
+        '''
+        Function to set the token value and refresh the header to the new token
+
+        Args:
+            token: new authorization token
+
+        Returns:
+            None
+        '''
+        self.token = token
+        self.refresh_header()
+
+    def refresh_header(self):
+        '''
+        Function to refresh the header
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        self.header = {'access-token' : self.token}
+        if self.session is not None:
+            self.session.headers.update(self.header)
+
+    def close(self):
+        '''
+        Function to close the API session, dispose the database engines and write the shared workbooks
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines = {}
+
+        with self._xlsx_lock:
+            for workbook in self._workbooks.values():
+                workbook.close()
+            self._workbooks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_engine(self):
+        '''
+        Function to return the engine of the current database target, creating it on the first call. One
+        engine (and its connection pool) is kept per store_type and connection string
+
+        Args:
+            None
+
+        Returns:
+            sqlalchemy Engine
+        '''
+        if self.store_type == 'postgres':
+            driver = 'postgresql+psycopg2://'
+            _import('psycopg2')
+        else:
+            driver = 'mysql+mysqldb://'
+            _import('MySQLdb')
+
+        sqlalchemy = _import('sqlalchemy', self.store_type)
+
+        engine_path = driver + str(self.db_user) + ':' + str(self.db_password) + '@' + str(self.db_host) \
+                    + ':' + str(self.db_port) + '/' + str(self.database)
+
+        #LOAD DATA LOCAL INFILE must be enabled on the client side
+        connect_args = {'local_infile' : 1} if self.store_type == 'mysql' else {}
+
+        with self._lock:
+            if engine_path not in self._engines:
+                self._engines[engine_path] = sqlalchemy.create_engine(engine_path, pool_size = self.db_pool_size, max_overflow = self.db_max_overflow,
+                                                                      pool_recycle = self.db_pool_recycle, pool_pre_ping = True,
+                                                                      connect_args = connect_args)
+
+        return self._engines[engine_path]
+
+    def _get_session(self):
+        '''
+        Function to return the shared session, creating it with a keep-alive connection pool on the first call
+
+        Args:
+            None
+
+        Returns:
+            requests.Session
+        '''
+        with self._lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections = self.pool_connections, pool_maxsize = self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Accept-Encoding' : 'gzip, deflate', 'Connection' : 'keep-alive'})
+                session.headers.update(self.header)
+                self.session = session
+
+        return self.session
+
+    def _get_cache(self):
+        '''
+        Function to return the response cache, creating it on the first call
+
+        Args:
+            None
+
+        Returns:
+            ResponseCache
+        '''
+        with self._lock:
+            if self._cache is None or self._cache.path != self.cache_path:
+                self._cache = ResponseCache(self.cache_path, self.cache_max_entries)
+            self._cache.max_entries = self.cache_max_entries
+
+        return self._cache
+
+    def _get_checkpoint(self):
+        '''
+        Function to return the checkpoint spill directory, creating it on the first call
+
+        Args:
+            None
+
+        Returns:
+            Checkpoint
+        '''
+        with self._lock:
+            if self._checkpoint is None or self._checkpoint.path != self.checkpoint_path:
+                self._checkpoint = Checkpoint(self.checkpoint_path, self.checkpoint_ttl)
+            self._checkpoint.ttl = self.checkpoint_ttl
+
+        return self._checkpoint
+
+    def _checkpoint_unit(self, url):
+        '''
+        Function to look up the checkpoint unit of a request. A completed unit is answered with a stand-in
+        response holding lists of the original sizes and its meta, enough for the pagination, and marked as
+        replayed so _output reads its dataframe from the checkpoint
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            tuple of the unit key and the stand-in response or None
+        '''
+        checkpoint = self._get_checkpoint()
+        key = checkpoint.key(url, self.token)
+        summary = checkpoint.get(key)
+        if summary is None:
+            return key, None
+
+        r = {name : [None] * size for name, size in summary['lists'].items()}
+        if summary['meta'] is not None:
+            r['meta'] = summary['meta']
+        r['_checkpoint'] = key
+        r['_replayed'] = True
+
+        return key, r
+
+    def _endpoint(self, url):
+        '''
+        Function to return the endpoint name of an url, the path after /external_api/v1/
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            str
+        '''
+        return urlsplit(url).path.split('/external_api/v1/')[-1]
+
+    def _emit(self, event, endpoint, **values):
+        '''
+        Function to add the numeric values of an event to self.stats and pass the event to every hook
+
+        Args:
+            event: request, cache, page, compact, diff, store or call
+            endpoint: API endpoint name
+            values: event values, the ones named like the STATS columns are summed into self.stats
+
+        Returns:
+            None
+        '''
+        with self._lock:
+            stats = self.stats.setdefault(endpoint, dict.fromkeys(STATS, 0))
+            for name, value in values.items():
+                if name in stats:
+                    stats[name] += value
+
+        for hook in self.hooks:
+            hook(event, dict(values, endpoint = endpoint))
+
+    def summary(self, reset = False):
+        '''
+        Function to build and log the per-endpoint summary of the instrumentation collected since the
+        instance was created or last reset
+
+        Args:
+            reset: boolean to clear the statistics after the summary. Default False
+
+        Returns:
+            DataFrame with one row per endpoint and the STATS columns
+        '''
+        with self._lock:
+            df = pd.DataFrame.from_dict(self.stats, orient = 'index', columns = STATS)
+            if reset:
+                self.stats = {}
+
+        df.index.name = 'endpoint'
+        if len(df) > 0:
+            logger.info('--------Summary--------\n' + df.to_string())
+
+        return df
+
+    def _get_rate_limiter(self):
+        '''
+        Function to return the rate limiter shared by every request, creating it on the first call
+
+        Args:
+            None
+
+        Returns:
+            RateLimiter
+        '''
+        with self._lock:
+            if self._rate_limiter is None:
+                self._rate_limiter = RateLimiter(self.rate_limit, self.rate_burst, self.max_concurrency)
+
+        return self._rate_limiter
+
+    def _send(self, url, headers = None):
+        '''
+        Function to send a get request through the rate limiter. HTTP 429, 5xx, connection errors and
+        truncated bodies are retried up to max_retries times, waiting the Retry-After header when returned or a jittered
+        exponential backoff otherwise
+
+        Args:
+            url: full url passed to the API
+            headers: extra headers of the request. Default None
+
+        Returns:
+            requests.Response
+        '''
+        rate_limiter = self._get_rate_limiter()
+
+        for attempt in range(self.max_retries + 1):
+            backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+            rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self._get_session().get(url, headers = headers, timeout = self.timeout)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                #a body cut short is retried like a dropped connection
+                rate_limiter.release()
+                if attempt == self.max_retries:
+                    raise
+                logger.warning('--------Connection error on {}, retry in {:.1f}s--------'.format(url, backoff))
+                time.sleep(backoff)
+                continue
+            except BaseException:
+                rate_limiter.release()
+                raise
+
+            retry = response.status_code == 429 or response.status_code >= 500
+            self._emit('request', self._endpoint(url), requests = 1, request_seconds = time.perf_counter() - start,
+                       bytes = len(response.content), retries = int(retry), url = url, status = response.status_code)
+
+            if not retry:
+                rate_limiter.release()
+                return response
+
+            retry_after = self._retry_after(response)
+            rate_limiter.release(throttled = response.status_code == 429, retry_after = retry_after)
+            if attempt == self.max_retries:
+                response.raise_for_status()
+
+            wait = retry_after if retry_after is not None else backoff
+            logger.warning('--------HTTP {} on {}, retry in {:.1f}s--------'.format(response.status_code, url, wait))
+            time.sleep(wait)
+
+    def _retry_after(self, response):
+        '''
+        Function to read the Retry-After header, given in seconds or as an HTTP date
+
+        Args:
+            response: requests.Response
+
+        Returns:
+            float or None
+        '''
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _request(self, url):
+        '''
+        Function to call the API through _request_json. With checkpoint_path set, the requests completed by a
+        previous run are answered from the checkpoint and the others are tagged with their unit key
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            dict
+        '''
+        if not self.checkpoint_path:
+            return self._request_json(url)
+
+        key, replayed = self._checkpoint_unit(url)
+        if replayed is not None:
+            return replayed
+
+        r = self._request_json(url)
+        r['_checkpoint'] = key
+
+        return r
+
+    def _request_json(self, url):
+        '''
+        Function to call the API and return the parsed json. With cache_path set, the endpoints in cache_ttl
+        are answered from the cache while the TTL lasts and revalidated with If-None-Match/If-Modified-Since
+        after it
+
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            dict
+        '''
+        endpoint = self._endpoint(url)
+        if not self.cache_path or endpoint not in self.cache_ttl:
+            response = self._send(url)
+            response.raise_for_status()
+            return _loads(response.content)
+
+        cache = self._get_cache()
+        key = cache.key(url, self.token)
+        entry = cache.get(key)
+        if entry is not None and time.time() - entry['stored_at'] < self.cache_ttl[endpoint]:
+            self._emit('cache', endpoint, cached = 1, url = url)
+            return _loads(entry['body'])
+
+        headers = {}
+        if entry is not None and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self._send(url, headers)
+        if response.status_code == 304 and entry is not None:
+            self._emit('cache', endpoint, cached = 1, url = url)
+            cache.touch(key)
+            return _loads(entry['body'])
+
+        response.raise_for_status()
+        cache.set(key, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+        return _loads(response.content)
+
+    def _plan_pages(self, url_base, r, key, per_page):
+        '''
+        Function to plan the pages following the first page of a paginated call, shared by the Get and
+        AsyncGet fetch generators. The API caps per_page without an error, so the size of the first page is
+        the page size when the total count in meta shows there are more elements, or when a first page of at
+        least 100 elements (always accepted) comes back smaller than per_page without a count: the second page
+        then tells whether it was capped, unless it is smaller than the size kept by _learn_per_page. With the
+        total count the last page is known, otherwise the pages are fetched speculatively until one returns
+        less than the page size
+
+        Args:
+            url_base: url of the paginated call
+            r: json of the first page
+            key: json key holding the list of elements
+            per_page: number of elements per page requested
+
+        Returns:
+            tuple of the page size of the next pages and the last page (1 when the first page is the only one
+            or None when it is unknown)
+        '''
+        returned = len(r[key])
+        meta_count = r.get('meta', {}).get('count')
+        if meta_count is not None:
+            if returned == 0 or int(meta_count) <= returned:
+                return per_page, 1
+            return returned, math.ceil(int(meta_count) / returned)
+
+        if returned < min(per_page, 100):
+            return per_page, 1
+
+        if returned < per_page:
+            endpoint = self._endpoint(url_base)
+            cap = self._page_sizes.get('per_page.' + endpoint + '.' + str(self.per_page.get(endpoint, 100)))
+            if cap is not None and returned < cap:
+                return per_page, 1
+
+        return min(returned, per_page), None
+
+    def _fetch_pages(self, url_base, key, per_page = 100):
+        '''
+        Generator to fetch every page of a paginated endpoint. The first page is fetched alone; when its meta
+        returns the total count the remaining pages are fetched concurrently, otherwise the next pages are
+        prefetched speculatively until a page returns less than the page size. The next pages are requested
+        with the page size planned by _plan_pages, kept by _learn_per_page when the API capped per_page. Pages
+        are yielded in order
+
+        Args:
+            url_base: url ending with '?' or '&' to which page and per_page are appended
+            key: json key holding the list of elements
+            per_page: number of elements per page. Default 100
+
+        Returns:
+            generator of dict
+        '''
+        def page_url(page, size):
+            return url_base + 'page=' + str(page) + '&' + 'per_page=' + str(size)
+
+        def fetch(page, size):
+            logger.debug('--------Page {}--------'.format(page))
+            return self._request(page_url(page, size))
+
+        r = fetch(1, per_page)
+        yield r
+        #with the total count the last page is known, otherwise pages are prefetched speculatively
+        size, last_page = self._plan_pages(url_base, r, key, per_page)
+        if last_page == 1:
+            return
+
+        #keep at most max_workers pages in flight so memory stays bounded when the pages are streamed
+        next_page = 2
+        futures = deque()
+        executor = ThreadPoolExecutor(max_workers = self.max_workers)
+        try:
+            while True:
+                while len(futures) < self.max_workers and (last_page is None or next_page <= last_page):
+                    futures.append(executor.submit(fetch, next_page, size))
+                    next_page += 1
+
+                if not futures:
+                    break
+
+                page = next_page - len(futures)
+                r = futures.popleft().result()
+                #elements after a smaller first page show the API capped per_page
+                if page == 2 and size < per_page and r[key]:
+                    self._learn_per_page(url_base, size)
+                yield r
+                if last_page is None and len(r[key]) < size:
+                    break
+        finally:
+            executor.shutdown(wait = False, cancel_futures = True)
+
+    def _fetch_many(self, url_bases, key, per_page = 100, max_workers = None, labels = None):
+        '''
+        Generator to fetch every page of many paginated calls on one bounded pool. The first page of every call
+        is scheduled as the call is admitted, at most max_workers calls being open at a time, and the remaining
+        pages are scheduled as soon as the first page tells how many there are (or, without a total count,
+        one after the other until a page returns less than the page size planned by _plan_pages). Pages are
+        yielded in url_bases order and, inside each call, in page order
+
+        Args:
+            url_bases: list of urls ending with '?' or '&' to which page and per_page are appended
+            key: json key holding the list of elements
+            per_page: number of elements per page. Default 100
+            max_workers: maximum number of concurrent calls. Default None (uses self.max_workers)
+            labels: list of labels printed for each url. Default None
+
+        Returns:
+            generator of dict
+        '''
+        if labels is None:
+            labels = [str(unit) for unit in range(len(url_bases))]
+
+        def fetch(unit, page):
+            logger.debug('--------{} Page {}--------'.format(labels[unit], page))
+            url = url_bases[unit] + 'page=' + str(page) + '&' + 'per_page=' + str(sizes[unit])
+            return unit, page, self._request(url)
+
+        results = [{} for _ in url_bases]
+        outstanding = [1 for _ in url_bases]
+        sizes = [per_page for _ in url_bases]
+        last_pages = [None for _ in url_bases]
+        next_unit = 0
+        next_admit = 0
+        workers = max_workers or self.max_workers
+
+        executor = ThreadPoolExecutor(max_workers = workers)
+        try:
+            pending = set()
+            #admit the calls gradually so only the pages of the open calls are kept in memory
+            while next_admit < len(url_bases) and next_admit - next_unit < workers:
+                pending.add(executor.submit(fetch, next_admit, 1))
+                next_admit += 1
+            while pending:
+                finished, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in finished:
+                    unit, page, r = future.result()
+                    results[unit][page] = r
+                    outstanding[unit] -= 1
+
+                    if page == 1:
+                        sizes[unit], last_pages[unit] = self._plan_pages(url_bases[unit], r, key, per_page)
+                        #total count known: schedule the remaining pages once
+                        for next_page in range(2, (last_pages[unit] or 1) + 1):
+                            pending.add(executor.submit(fetch, unit, next_page))
+                            outstanding[unit] += 1
+                    elif page == 2 and sizes[unit] < per_page and r[key]:
+                        self._learn_per_page(url_bases[unit], sizes[unit])
+
+                    if last_pages[unit] is None and len(r[key]) == sizes[unit]:
+                        pending.add(executor.submit(fetch, unit, page + 1))
+                        outstanding[unit] += 1
+
+                #yield the calls already complete, keeping the url_bases order
+                while next_unit < len(url_bases) and outstanding[next_unit] == 0:
+                    for page in sorted(results[next_unit]):
+                        yield results[next_unit][page]
+                    results[next_unit] = None
+                    next_unit += 1
+
+                while next_admit < len(url_bases) and next_admit - next_unit < workers:
+                    pending.add(executor.submit(fetch, next_admit, 1))
+                    next_admit += 1
+        finally:
+            executor.shutdown(wait = False, cancel_futures = True)
+
+    def _store(self, df, store_name, endpoint = None, store_mode = None):
+        '''
+        Function to store the dataframe returned through a call function accordingly to store_type and 
+        store_mode
+
+        Args:
+            df: dataframe returned through the call function
+            store_name: file or table name to store the dataframe
+            endpoint: API endpoint name, used to pick the schema of the parquet and arrow files. Default None
+            store_mode: store mode overriding self.store_mode. Default None
+
+        Returns:
+            None
+        '''
+        store_mode = store_mode or self.store_mode
+
+        if self.store_type == 'csv':
+            df.to_csv(self.local_path + '/' + store_name +'.csv', index = False)
+            
+        elif self.store_type == 'xlsx':
+            if self.xlsx_stream or self.workbook:
+                self._store_xlsx([df], store_name)
+            else:
+                df.to_excel(self.local_path + '/' + store_name +'.xlsx', index = False)
+
+        elif self.store_type == 'parquet':
+            pq = _import('pyarrow.parquet')
+
+            path = self.local_path + '/' + store_name + '.parquet'
+            table = self._arrow_table(df, endpoint)
+            partition_date = Endpoints.PARTITION_DATES.get(endpoint)
+
+            #the previous file or partitioned directory is replaced
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+
+            if self.partition and partition_date in df:
+                #one directory per month of the partition date
+                month = pd.to_datetime(df[partition_date], errors = 'coerce').dt.strftime('%Y-%m').fillna('none')
+                table = table.append_column('month', self._arrow_array(month, 'string'))
+                pq.write_to_dataset(table, path, partition_cols = ['month'], compression = self.compression)
+            else:
+                pq.write_table(table, path, compression = self.compression)
+
+        elif self.store_type == 'arrow':
+            feather = _import('pyarrow.feather')
+
+            feather.write_feather(self._arrow_table(df, endpoint), self.local_path + '/' + store_name + '.arrow', compression = self.compression)
+            
+        elif self.store_type == 'postgres':
+            if len(df) == 0:
+                sys.exit('Empty Dataframe')
+            else:
+                engine = self._get_engine()
+                con = engine.raw_connection()
+                cur = con.cursor()
+                
+                
+                table = store_name
+                try:
+                    if store_mode == 'trunc':
+                        cur.execute('truncate ' + store_name +';')
+
+                    elif store_mode == 'create':
+                        self._create_table(df, store_name, engine, if_exists = 'replace')
+
+                    elif store_mode == 'swap':
+                        table = self._swap_staging(cur, df, store_name, engine)
+
+                    #faster than df.to_sql to input data
+                    output = io.StringIO()
+                    df.to_csv(output, sep = '\t', header = False, index = False)
+                    output.seek(0)
+                    cur.copy_from(output, table, null = "") # null values become ''
+
+                    if store_mode == 'swap':
+                        self._swap(cur, store_name)
+
+                    con.commit()
+                finally:
+                    con.close()
+
+        elif self.store_type == 'mysql':
+            if len(df) == 0:
+                sys.exit('Empty Dataframe')
+            else:
+                engine = self._get_engine()
+                con = engine.raw_connection()
+                cur = con.cursor()
+
+                try:
+                    if store_mode == 'trunc':
+                        #the table is kept, only created when it doesn't exist yet
+                        if not _import('sqlalchemy', self.store_type).inspect(engine).has_table(store_name):
+                            self._create_table(df, store_name, engine)
+                        cur.execute('truncate table ' + store_name + ';')
+
+                    elif store_mode == 'create':
+                        self._create_table(df, store_name, engine, if_exists = 'replace')
+
+                    elif store_mode == 'swap':
+                        sys.exit('Invalid Option')
+
+                    #faster than df.to_sql to input data
+                    self._mysql_load(cur, df, store_name)
+
+                    con.commit()
+                finally:
+                    con.close()
+        
+        elif self.store_type is None:
+            return None
+            
+        else:
+            sys.exit('Invalid Option')
+
+    def _date_windows(self, start_date, end_date):
+        '''
+        Function to split a date range into the windows set by date_window. Windows don't overlap and cover
+        the whole range
+
+        Args:
+            start_date: 'YYYY-MM-DD' format. Start of the range
+            end_date: 'YYYY-MM-DD' format. End of the range
+
+        Returns:
+            list of (start_date, end_date) tuples
+        '''
+        if self.date_window is None:
+            return [(start_date, end_date)]
+
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+        windows = []
+
+        while start <= end:
+            if self.date_window == 'month':
+                next_start = (start.replace(day = 1) + timedelta(days = 32)).replace(day = 1)
+            else:
+                next_start = start + timedelta(days = int(self.date_window))
+
+            windows.append((start.isoformat(), min(next_start - timedelta(days = 1), end).isoformat()))
+            start = next_start
+
+        return windows
+
+    def _fetch_windows(self, url_base, start_date, end_date, medical_certificate):
+        '''
+        Generator to fetch a date-ranged endpoint once per medical_certificate value and date window. Up to
+        max_workers calls run concurrently and the responses are yielded in medical_certificate and window order
+
+        Args:
+            url_base: url ending with '?' or '&' to which the dates and medical_certificate are appended
+            start_date: 'YYYY-MM-DD' format. Start date passed to the API
+            end_date: 'YYYY-MM-DD' format. End date passed to the API
+            medical_certificate: list containing 'true' and/or 'false'
+
+        Returns:
+            generator of dict
+        '''
+        def fetch(window_start, window_end, certificate):
+            logger.debug('--------Medical Certificate = {} From {} To {}--------'.format(certificate, window_start, window_end))
+            url = url_base + 'start_date=' + window_start + '&' + 'end_date=' + window_end + '&' + 'medical_certificate=' + str(certificate)
+            return self._request(url)
+
+        calls = [(window_start, window_end, certificate) for certificate in medical_certificate
+                 for window_start, window_end in self._date_windows(start_date, end_date)]
+
+        futures = deque()
+        executor = ThreadPoolExecutor(max_workers = self.max_workers)
+        try:
+            for call in calls:
+                futures.append(executor.submit(fetch, *call))
+                if len(futures) >= self.max_workers:
+                    yield futures.popleft().result()
+
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            executor.shutdown(wait = False, cancel_futures = True)
+
+    def _attributes(self, endpoint):
+        '''
+        Function to build the attributes= projection of an endpoint from the first key of its fields paths
+
+        Args:
+            endpoint: API endpoint name
+
+        Returns:
+            str with the attributes separated by commas
+        '''
+        attributes = []
+        for _, path, _ in self.fields[endpoint]:
+            attribute = path.split('.')[0]
+            if attribute not in attributes:
+                attributes.append(attribute)
+
+        return ','.join(attributes)
+
+    def _per_page(self, endpoint):
+        '''
+        Function to return the page size requested on the first page of a paginated endpoint, the size in
+        self.per_page. The first page keeps the same url on every run, so checkpoint units of a failed call are
+        found again. The page size the API accepted on a previous call, kept in the sync state store (when
+        store_type is set) under per_page.<endpoint>.<size tried>, is loaded here for _plan_pages
+
+        Args:
+            endpoint: API endpoint name
+
+        Returns:
+            int
+        '''
+        tried = self.per_page.get(endpoint, 100)
+        name = 'per_page.' + endpoint + '.' + str(tried)
+        if name not in self._page_sizes:
+            size = self._get_state(name) if tried > 100 and self.store_type is not None else None
+            self._page_sizes[name] = int(size) if size is not None else None
+
+        return tried
+
+    def _learn_per_page(self, url_base, size):
+        '''
+        Function to keep the page size the API returned for an endpoint when it capped the size requested,
+        so the next calls without a total count know a smaller first page is the last one
+
+        Args:
+            url_base: url of the paginated call
+            size: number of elements per page returned by the API
+
+        Returns:
+            None
+        '''
+        endpoint = self._endpoint(url_base)
+        name = 'per_page.' + endpoint + '.' + str(self.per_page.get(endpoint, 100))
+        with self._lock:
+            if self._page_sizes.get(name) == size:
+                return None
+            self._page_sizes[name] = size
+
+        logger.info('--------per_page of {}: {}--------'.format(endpoint, size))
+        if self.store_type is not None:
+            self._set_state(name, size)
+
+    def _decode(self, records, endpoint):
+        '''
+        Function to extract the fields of an endpoint from the API records directly into typed columns,
+        without flattening the whole records as pd.json_normalize does
+
+        Args:
+            records: list of dicts returned by the API
+            endpoint: API endpoint name
+
+        Returns:
+            DataFrame with the columns of self.fields[endpoint]
+        '''
+        columns = {}
+        for name, path, type_name in self.fields[endpoint]:
+            keys = path.split('.')
+            if len(keys) == 1:
+                values = [record.get(keys[0]) for record in records]
+            else:
+                values = []
+                for record in records:
+                    value = record
+                    for key in keys:
+                        value = value.get(key) if isinstance(value, dict) else None
+                    values.append(value)
+
+            if type_name == 'int64':
+                columns[name] = pd.array(values, dtype = 'Int64')
+            elif type_name == 'float64':
+                columns[name] = pd.array(values, dtype = 'Float64')
+            elif type_name == 'bool':
+                columns[name] = pd.array(values, dtype = 'boolean')
+            else:
+                columns[name] = pd.Series(values, dtype = object)
+
+        return pd.DataFrame(columns)
+
+    def _compact_column(self, values, type_name):
+        '''
+        Function to convert a column to a compact dtype. The column is kept as returned when the conversion
+        would lose values
+
+        Args:
+            values: pandas series
+            type_name: integer, float, date, timestamp, boolean or category
+
+        Returns:
+            pandas series
+        '''
+        missing = values.isna().sum()
+
+        try:
+            if type_name == 'integer':
+                numbers = pd.to_numeric(values, errors = 'coerce')
+                if numbers.isna().sum() > missing or (numbers.dropna() % 1 != 0).any():
+                    return values
+                if len(numbers.dropna()) == 0:
+                    return numbers
+                #smallest integer holding every value, nullable when values are missing
+                for bits in (8, 16, 32, 64):
+                    if -2 ** (bits - 1) <= numbers.min() and numbers.max() < 2 ** (bits - 1):
+                        break
+                compact = numbers.astype(('Int' if missing else 'int') + str(bits))
+
+            elif type_name == 'float':
+                compact = pd.to_numeric(values, errors = 'coerce', downcast = 'float')
+
+            elif type_name == 'date':
+                compact = pd.to_datetime(values, errors = 'coerce')
+
+            elif type_name == 'timestamp':
+                compact = pd.to_datetime(values, errors = 'coerce', utc = True).dt.tz_convert(None)
+
+            elif type_name == 'boolean':
+                compact = values.astype('boolean')
+
+            elif type_name == 'category':
+                if values.nunique() > len(values) / 2:
+                    return values
+                compact = values.astype('category')
+
+            else:
+                return values
+
+        except (TypeError, ValueError):
+            return values
+
+        if compact.isna().sum() > missing:
+            return values
+
+        return compact
+
+    def _compact(self, df, endpoint, categories = False):
+        '''
+        Function to convert the columns of a dataframe to the compact dtypes of the endpoint in self.dtypes and
+        record the memory saved in self.stats. Categories are built apart, on the concatenated result, since
+        dataframes with different categories are concatenated back to object columns
+
+        Args:
+            df: dataframe returned through the call function
+            endpoint: API endpoint name
+            categories: boolean to convert only the category columns instead of every other column. Default False
+
+        Returns:
+            DataFrame
+        '''
+        dtypes = {column : type_name for column, type_name in self.dtypes.get(endpoint, {}).items()
+                  if column in df and (type_name == 'category') == categories}
+        if not dtypes or len(df) == 0:
+            return df
+
+        before = df.memory_usage(index = False, deep = True).sum()
+        df = df.copy()
+        for column, type_name in dtypes.items():
+            df[column] = self._compact_column(df[column], type_name)
+        saved = int(before - df.memory_usage(index = False, deep = True).sum())
+
+        self._emit('compact', endpoint, memory_saved = saved)
+
+        return df
+
+    def _arrow_array(self, values, type_name = None):
+        '''
+        Function to convert a column to an arrow array of the given type
+
+        Args:
+            values: pandas series
+            type_name: int64, float64, string, bool, date32, timestamp or None to infer the type. Default None
+
+        Returns:
+            pyarrow Array
+        '''
+        pa = _import('pyarrow')
+
+        types = {'int64' : pa.int64(), 'float64' : pa.float64(), 'string' : pa.string(), 'bool' : pa.bool_(),
+                 'date32' : pa.date32(), 'timestamp' : pa.timestamp('us', tz = 'UTC')}
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+
+        if type_name == 'date32':
+            values = pd.to_datetime(values, errors = 'coerce').dt.date
+        elif type_name == 'timestamp':
+            values = pd.to_datetime(values, errors = 'coerce', utc = True)
+        elif type_name == 'string':
+            values = values.where(values.isna(), values.astype(str))
+
+        return pa.array(values, type = types.get(type_name), from_pandas = True)
+
+    def _arrow_table(self, df, endpoint = None):
+        '''
+        Function to convert a dataframe to an arrow table typed by the endpoint schema in self.schemas
+
+        Args:
+            df: dataframe returned through the call function
+            endpoint: API endpoint name. Default None (every type is inferred)
+
+        Returns:
+            pyarrow Table
+        '''
+        pa = _import('pyarrow')
+
+        schema = self.schemas.get(endpoint, {})
+        arrays = [self._arrow_array(df[column], schema.get(column)) for column in df.columns]
+
+        return pa.Table.from_arrays(arrays, names = [str(column) for column in df.columns])
+
+    def _get_state(self, name):
+        '''
+        Function to read a value from the sync state store: the state_table for postgres/mysql and the
+        state_path json file otherwise
+
+        Args:
+            name: state name
+
+        Returns:
+            str or None
+        '''
+        if self.store_type in ('postgres', 'mysql'):
+            con = self._get_engine().raw_connection()
+            try:
+                cur = con.cursor()
+                cur.execute('create table if not exists ' + self.state_table + ' (name varchar(255) primary key, value text);')
+                cur.execute('select value from ' + self.state_table + ' where name = %s;', (name,))
+                row = cur.fetchone()
+                con.commit()
+            finally:
+                con.close()
+
+            return row[0] if row else None
+
+        state_path = self.state_path or self.local_path + '/pontomais_state.json'
+        if not os.path.exists(state_path):
+            return None
+
+        with open(state_path) as file:
+            return json.load(file).get(name)
+
+    def _set_state(self, name, value):
+        '''
+        Function to write a value to the sync state store
+
+        Args:
+            name: state name
+            value: state value
+
+        Returns:
+            None
+        '''
+        if self.store_type in ('postgres', 'mysql'):
+            if self.store_type == 'postgres':
+                sql = 'insert into ' + self.state_table + ' (name, value) values (%s, %s) on conflict (name) do update set value = excluded.value;'
+            else:
+                sql = 'replace into ' + self.state_table + ' (name, value) values (%s, %s);'
+
+            con = self._get_engine().raw_connection()
+            try:
+                cur = con.cursor()
+                cur.execute('create table if not exists ' + self.state_table + ' (name varchar(255) primary key, value text);')
+                cur.execute(sql, (name, str(value)))
+                con.commit()
+            finally:
+                con.close()
+
+        else:
+            state_path = self.state_path or self.local_path + '/pontomais_state.json'
+            with self._lock:
+                state = {}
+                if os.path.exists(state_path):
+                    with open(state_path) as file:
+                        state = json.load(file)
+
+                state[name] = str(value)
+                with open(state_path + '.tmp', 'w') as file:
+                    json.dump(state, file, indent = 2, sort_keys = True)
+                os.replace(state_path + '.tmp', state_path)
+
+    def _incremental_start(self, endpoint, store_name, start_date):
+        '''
+        Function to move the start date of an incremental call to the high-water mark of the last sync. The
+        last synced day is requested again because it may have changed after the previous run
+
+        Args:
+            endpoint: API endpoint name
+            store_name: file or table name to store the dataframe
+            start_date: 'YYYY-MM-DD' format. Start date requested by the caller
+
+        Returns:
+            str
+        '''
+        watermark = self._get_state('watermark.' + endpoint + '.' + store_name)
+        if watermark is not None and (start_date is None or watermark > start_date):
+            logger.info('--------Incremental from {}--------'.format(watermark))
+            return watermark
+
+        return start_date
+
+    def _swap_staging(self, cur, df, store_name, engine):
+        '''
+        Function to create the postgres staging table loaded by store_mode = swap: a copy of the table
+        structure with its indexes, defaults and grants, or the table of the dataframe when the table
+        doesn't exist yet
+
+        Args:
+            cur: cursor of an open psycopg2 connection
+            df: dataframe returned through the call function
+            store_name: table name
+            engine: sqlalchemy Engine
+
+        Returns:
+            str staging table name
+        '''
+        staging = store_name + '_staging'
+
+        cur.execute('select to_regclass(%s);', (store_name,))
+        if cur.fetchone()[0] is None:
+            #created on its own connection, which replaces a staging table left by a failed load
+            self._create_table(df, staging, engine, if_exists = 'replace')
+            return staging
+
+        cur.execute('drop table if exists ' + staging + ';')
+        cur.execute('create table ' + staging + ' (like ' + store_name + ' including all);')
+
+        #the readers keep their privileges after the swap. The acl is read from pg_class because
+        #information_schema only lists the grants made by the roles of the current user
+        cur.execute('select case when a.grantee = 0 then \'PUBLIC\' else quote_ident(r.rolname) end, a.privilege_type, '
+                    'a.is_grantable from pg_class c cross join aclexplode(c.relacl) a left join pg_roles r on r.oid = a.grantee '
+                    'where c.oid = to_regclass(%s) and a.grantee <> c.relowner;', (store_name,))
+        for grantee, privilege, grantable in cur.fetchall():
+            cur.execute('grant ' + privilege + ' on ' + staging + ' to ' + grantee + (' with grant option;' if grantable else ';'))
+
+        return staging
+
+    def _swap(self, cur, store_name):
+        '''
+        Function to rename the loaded staging table into place. The renames run at the end of the load
+        transaction, so readers are only locked out between them and the commit and never see a partial
+        table. When the readers hold the table longer than swap_lock_timeout the load is rolled back
+
+        Args:
+            cur: cursor of the connection that loaded the staging table
+            store_name: table name
+
+        Returns:
+            None
+        '''
+        schema, _, table = store_name.rpartition('.')
+
+        cur.execute("set local lock_timeout = '" + str(int(self.swap_lock_timeout * 1000)) + "ms';")
+        cur.execute('select to_regclass(%s);', (store_name,))
+        if cur.fetchone()[0] is not None:
+            cur.execute('drop table if exists ' + store_name + '_old;')
+            cur.execute('alter table ' + store_name + ' rename to ' + table + '_old;')
+            cur.execute('alter table ' + store_name + '_staging rename to ' + table + ';')
+
+            #the copied serial defaults still use the sequences owned by the replaced table, which would be
+            #dropped with it: they are handed over to the same columns of the new table
+            cur.execute('select d.objid::regclass::text, a.attname from pg_depend d join pg_class s on s.oid = d.objid '
+                        'join pg_attribute a on a.attrelid = d.refobjid and a.attnum = d.refobjsubid '
+                        'where d.refobjid = %s::regclass and d.deptype = \'a\' and s.relkind = \'S\';', (store_name + '_old',))
+            for sequence, column in cur.fetchall():
+                cur.execute('alter sequence ' + sequence + ' owned by ' + store_name + '."' + column + '";')
+
+            #fails, rolling the swap back, when views still depend on the replaced table
+            cur.execute('drop table ' + store_name + '_old;')
+        else:
+            cur.execute('alter table ' + store_name + '_staging rename to ' + table + ';')
+
+    def _create_table(self, df, store_name, engine, if_exists = 'fail'):
+        '''
+        Function to create the table of a dataframe without rows. Compact integers are created as 64 bits and
+        categories as text columns, so the table type doesn't depend on the values of the first load
+
+        Args:
+            df: dataframe returned through the call function
+            store_name: table name
+            engine: sqlalchemy Engine
+            if_exists: fail or replace, as in DataFrame.to_sql. Default fail
+
+        Returns:
+            None
+        '''
+        df = df.head(0)
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(object)
+            elif pd.api.types.is_integer_dtype(df[column].dtype):
+                df[column] = df[column].astype('Int64')
+
+        df.to_sql(store_name, engine, if_exists = if_exists, index = False)
+
+    def _mysql_load(self, cur, df, table):
+        '''
+        Function to bulk load a dataframe into a mysql table, through LOAD DATA LOCAL INFILE from a temporary
+        csv file or through batched multi-row inserts accordingly to mysql_load
+
+        Args:
+            cur: cursor of an open MySQLdb connection
+            df: dataframe to load, with the columns in the table order
+            table: table name
+
+        Returns:
+            None
+        '''
+        #booleans are stored by mysql as tinyint
+        df = df.copy()
+        for column in df.columns:
+            if df[column].dtype == bool or str(df[column].dtype) == 'boolean':
+                df[column] = df[column].astype('Int64')
+
+        if self.mysql_load == 'infile':
+            with tempfile.NamedTemporaryFile('w', suffix = '.csv', newline = '', encoding = 'utf-8', delete = False) as file:
+                df.to_csv(file, header = False, index = False, na_rep = 'NULL', quoting = csv.QUOTE_MINIMAL)
+            try:
+                cur.execute("load data local infile '" + file.name.replace('\\', '/') + "' into table " + table +
+                            " character set utf8mb4 fields terminated by ',' optionally enclosed by '\"' escaped by ''" +
+                            " lines terminated by '\\n';")
+            finally:
+                os.remove(file.name)
+
+        elif self.mysql_load == 'insert':
+            sql = 'insert into ' + table + ' values (' + ', '.join(['%s'] * len(df.columns)) + ')'
+            values = df.astype(object).where(df.notna(), None)
+            for start in range(0, len(values), self.mysql_batch_size):
+                #MySQLdb sends executemany inserts as one multi-row insert
+                cur.executemany(sql, values.iloc[start:start + self.mysql_batch_size].values.tolist())
+
+        else:
+            sys.exit('Invalid Option')
+
+    def _store_upsert(self, df, store_name, key, endpoint = None):
+        '''
+        Function to upsert the dataframe into the stored file or table: rows with a key already stored are
+        replaced and the new ones are inserted, nothing is truncated
+
+        Args:
+            df: dataframe returned through the call function
+            store_name: file or table name to store the dataframe
+            key: column identifying the rows
+            endpoint: API endpoint name, used to pick the schema of the parquet and arrow files. Default None
+
+        Returns:
+            None
+        '''
+        if self.store_type in ('csv', 'xlsx', 'parquet', 'arrow'):
+            path = self.local_path + '/' + store_name + '.' + self.store_type
+            #an empty window keeps the stored history, the empty file is only written when there is none
+            if len(df) == 0 and os.path.exists(path):
+                return None
+
+            #a sheet of the shared workbook is only written once, there is nothing stored to merge
+            if os.path.exists(path) and not (self.store_type == 'xlsx' and self.workbook):
+                if self.store_type == 'csv':
+                    stored = pd.read_csv(path)
+                elif self.store_type == 'xlsx':
+                    stored = pd.read_excel(path)
+                elif self.store_type == 'parquet':
+                    #the partition column is rebuilt by _store
+                    stored = pd.read_parquet(path).drop(columns = 'month', errors = 'ignore')
+                else:
+                    stored = pd.read_feather(path)
+                df = pd.concat([stored, df], ignore_index=True).drop_duplicates(subset = key, keep = 'last')
+            self._store(df, store_name, endpoint)
+
+        elif self.store_type == 'postgres':
+            if len(df) == 0:
+                return None
+
+            con = self._get_engine().raw_connection()
+            try:
+                cur = con.cursor()
+                cur.execute('create temp table ' + store_name + '_upsert (like ' + store_name + ' including defaults) on commit drop;')
+
+                output = io.StringIO()
+                df.to_csv(output, sep = '\t', header = False, index = False)
+                output.seek(0)
+                cur.copy_from(output, store_name + '_upsert', null = "") # null values become ''
+
+                cur.execute('delete from ' + store_name + ' using ' + store_name + '_upsert u where ' + store_name + '.' + key + ' = u.' + key + ';')
+                cur.execute('insert into ' + store_name + ' select * from ' + store_name + '_upsert;')
+                con.commit()
+            finally:
+                con.close()
+
+        elif self.store_type == 'mysql':
+            if len(df) == 0:
+                return None
+
+            con = self._get_engine().raw_connection()
+            try:
+                cur = con.cursor()
+                cur.execute('drop table if exists ' + store_name + '_upsert;')
+                cur.execute('create table ' + store_name + '_upsert like ' + store_name + ';')
+                self._mysql_load(cur, df, store_name + '_upsert')
+
+                cur.execute('delete t from ' + store_name + ' t join ' + store_name + '_upsert u on t.' + key + ' = u.' + key + ';')
+                cur.execute('insert into ' + store_name + ' select * from ' + store_name + '_upsert;')
+                cur.execute('drop table ' + store_name + '_upsert;')
+                con.commit()
+            finally:
+                con.close()
+
+        else:
+            self._store(df, store_name, endpoint)
+
+    def _row_hashes(self, df, key):
+        '''
+        Function to hash the rows of a dataframe by key. Values are hashed as text so the hash doesn't depend
+        on the dtypes inferred on each run
+
+        Args:
+            df: dataframe returned through the call function
+            key: column identifying the rows
 
-    def set_token(self, token):
+        Returns:
+            dict of key and 16 hex digits hash
         '''
-        Function to set the token value and refresh the header to the new token
+        hashes = pd.util.hash_pandas_object(df.astype(str), index = False)
+        return dict(zip(df[key].astype(str), hashes.map('{:016x}'.format)))
+
+    def _get_hashes(self, store_name):
+        '''
+        Function to read the row hashes of the last diff store: the store_name_hashes table for postgres/mysql
+        and the local_path/store_name.hashes.json file otherwise
 
         Args:
-            token: new authorization token
+            store_name: file or table name to store the dataframe
 
         Returns:
-            None
+            dict of key and hash or None when there is no snapshot yet
         '''
-        self.token = token
-        self.header = {'access-token' : token}
+        if self.store_type in ('postgres', 'mysql'):
+            engine = self._get_engine()
+            if not _import('sqlalchemy', self.store_type).inspect(engine).has_table(store_name + '_hashes'):
+                return None
 
-    def refresh_header(self):
+            con = engine.raw_connection()
+            try:
+                cur = con.cursor()
+                cur.execute('select row_key, row_hash from ' + store_name + '_hashes;')
+                return dict(cur.fetchall())
+            finally:
+                con.close()
+
+        path = self.local_path + '/' + store_name + '.hashes.json'
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as file:
+            return json.load(file)
+
+    def _delete_keys(self, cur, table, column, keys):
         '''
-        Function to refresh the header
+        Function to delete the rows of a table by key through a temporary table of keys
 
         Args:
-            None
+            cur: cursor of an open connection, committed by the caller
+            table: table name
+            column: key column
+            keys: list of keys as text
 
         Returns:
             None
         '''
-        self.header = {'access-token' : token}
+        if not keys:
+            return None
+
+        keys = pd.DataFrame({column : keys})
+        if self.store_type == 'postgres':
+            cur.execute('create temp table ' + table + '_delete on commit drop as select ' + column + ' from ' + table + ' limit 0;')
+            output = io.StringIO()
+            keys.to_csv(output, sep = '\t', header = False, index = False)
+            output.seek(0)
+            cur.copy_from(output, table + '_delete')
+            cur.execute('delete from ' + table + ' using ' + table + '_delete d where ' + table + '.' + column + ' = d.' + column + ';')
+        else:
+            cur.execute('drop temporary table if exists ' + table + '_delete;')
+            cur.execute('create temporary table ' + table + '_delete as select ' + column + ' from ' + table + ' limit 0;')
+            self._mysql_load(cur, keys, table + '_delete')
+            cur.execute('delete t from ' + table + ' t join ' + table + '_delete d on t.' + column + ' = d.' + column + ';')
+            cur.execute('drop temporary table ' + table + '_delete;')
 
-    def _store(self, df, store_name):
+    def _store_diff(self, df, store_name, key, endpoint = None):
         '''
-        Function to store the dataframe returned through a call function accordingly to store_type and 
-        store_mode
+        Function to store only the rows changed since the last store. Each row is hashed by key and compared
+        with the hashes of the last snapshot: new and changed rows are upserted through _store_upsert, rows
+        no longer returned are deleted and the hashes are updated last, so a failed run is repeated safely by
+        the next one. The first run loads the whole dataframe. File stores are rewritten only when a row changed
 
         Args:
-            df: dataframe returned through the call function
+            df: dataframe returned through the call function, one row per key (the last one is kept)
             store_name: file or table name to store the dataframe
+            key: column identifying the rows
+            endpoint: API endpoint name. Default None
 
         Returns:
             None
         '''
-        if self.store_type == 'csv':
-            df.to_csv(self.local_path + '/' + store_name +'.csv', index = False)
-            
-        elif self.store_type == 'xlsx':
-            df.to_excel(self.local_path + '/' + store_name +'.xlsx', index = False)
-            
-        elif self.store_type == 'postgres':
-            if len(df) == 0:
-                sys.exit('Empty Dataframe')
-            else:
-                engine_path = 'postgresql+psycopg2://'+ str(self.db_user) + ':' + str(self.db_password) + '@' + str(self.db_host) \
-                            + ':' + str(self.db_port) + '/' + str(self.database) 
-                engine = create_engine(engine_path)        
-                con = engine.raw_connection()
-                cur = con.cursor()
-                
-                
-                if self.store_mode == 'trunc':
-                    cur.execute('truncate ' + store_name +';')
-                
-                elif self.store_mode == 'create':
-                    df.head(0).to_sql(store_name, engine, if_exists = 'replace', index = False)
+        database = self.store_type in ('postgres', 'mysql')
+        if database and len(df) == 0:
+            sys.exit('Empty Dataframe')
 
-                #faster than df.to_sql to input data    
+        df = df.drop_duplicates(subset = key, keep = 'last')
+        hashes = self._row_hashes(df, key)
+        stored = self._get_hashes(store_name)
+
+        if stored is None:
+            changed, deleted = list(hashes), []
+        else:
+            changed = [row_key for row_key, row_hash in hashes.items() if stored.get(row_key) != row_hash]
+            deleted = [row_key for row_key in stored if row_key not in hashes]
+
+        logger.info('--------{} diff: {} changed, {} deleted, {} unchanged--------'.format(
+            store_name, len(changed), len(deleted), len(hashes) - len(changed)))
+        self._emit('diff', endpoint, store_name = store_name, changed = len(changed), deleted = len(deleted))
+
+        if not database:
+            if stored is None or changed or deleted:
+                self._store(df, store_name, endpoint, store_mode = 'trunc')
+
+            path = self.local_path + '/' + store_name + '.hashes.json'
+            with open(path + '.tmp', 'w') as file:
+                json.dump(hashes, file)
+            os.replace(path + '.tmp', path)
+            return None
+
+        engine = self._get_engine()
+        if stored is None:
+            #first snapshot: the table is loaded whole
+            exists = _import('sqlalchemy', self.store_type).inspect(engine).has_table(store_name)
+            self._store(df, store_name, endpoint, store_mode = 'trunc' if exists else 'create')
+        elif changed:
+            self._store_upsert(df[df[key].astype(str).isin(set(changed))], store_name, key, endpoint)
+
+        con = engine.raw_connection()
+        try:
+            cur = con.cursor()
+            cur.execute('create table if not exists ' + store_name + '_hashes (row_key varchar(255) primary key, row_hash char(16));')
+            self._delete_keys(cur, store_name, key, deleted)
+            self._delete_keys(cur, store_name + '_hashes', 'row_key', changed + deleted)
+
+            rows = pd.DataFrame({'row_key' : changed, 'row_hash' : [hashes[row_key] for row_key in changed]})
+            if self.store_type == 'postgres':
                 output = io.StringIO()
-                df.to_csv(output, sep = '\t', header = False, index = False)
+                rows.to_csv(output, sep = '\t', header = False, index = False)
                 output.seek(0)
-                cur.copy_from(output, store_name, null = "") # null values become ''
+                cur.copy_from(output, store_name + '_hashes')
+            else:
+                self._mysql_load(cur, rows, store_name + '_hashes')
+            con.commit()
+        finally:
+            con.close()
+
+    def _store_xlsx(self, batches, store_name):
+        '''
+        Function to write dataframes to an xlsx sheet row by row through xlsxwriter in constant memory mode.
+        With workbook set the sheet is added to the shared workbook, written when the instance is closed,
+        otherwise local_path/store_name.xlsx is written. The columns are fixed by the first dataframe and more
+        rows than an Excel sheet holds end the run instead of being dropped
+
+        Args:
+            batches: iterable of dataframes
+            store_name: file name or sheet name of the shared workbook, cut to the 31 characters allowed by Excel
+
+        Returns:
+            None
+        '''
+        xlsxwriter = _import('xlsxwriter')
+        options = {'constant_memory' : True, 'strings_to_numbers' : False, 'strings_to_formulas' : False,
+                   'strings_to_urls' : False, 'remove_timezone' : True, 'default_date_format' : 'yyyy-mm-dd hh:mm:ss'}
+
+        if self.workbook:
+            path = self.local_path + '/' + self.workbook + '.xlsx'
+            with self._xlsx_lock:
+                if path not in self._workbooks:
+                    self._workbooks[path] = xlsxwriter.Workbook(path, options)
+                workbook = self._workbooks[path]
+                #each sheet keeps its own temporary file, so the sheets of the shared workbook are written concurrently
+                worksheet = workbook.add_worksheet(store_name[:31])
+        else:
+            workbook = xlsxwriter.Workbook(self.local_path + '/' + store_name + '.xlsx', options)
+            worksheet = workbook.add_worksheet()
+
+        #constant memory sheets are written in row order
+        columns = None
+        row = 1
+        for df_temp in batches:
+            if columns is None:
+                columns = df_temp.columns
+                worksheet.write_row(0, 0, [str(column) for column in columns])
+            df_temp = df_temp.reindex(columns = columns)
+
+            #python values, missing values as blank cells and nested json values as text, converted in slices
+            #so a whole dataframe is never copied at once
+            for start in range(0, len(df_temp), 10000):
+                chunk = df_temp.iloc[start:start + 10000]
+                values = chunk.astype(object).where(chunk.notna(), None)
+                for record in values.itertuples(index = False, name = None):
+                    #xlsxwriter skips the rows past the sheet limit returning -1, so the sheet would be cut silently
+                    if worksheet.write_row(row, 0, [value if value is None or isinstance(value, (str, int, float, date))
+                                                    else str(value) for value in record]) == -1:
+                        sys.exit('Too many rows for a xlsx sheet, max 1048575')
+                    row += 1
+
+        if not self.workbook:
+            workbook.close()
+
+    def _store_batches(self, batches, store_name, endpoint = None):
+        '''
+        Function to store the dataframes yielded by a call function one by one, so only one page is kept in
+        memory. csv files are appended, streamed xlsx sheets are written row by row, postgres receives one COPY
+        per batch and mysql one bulk load per batch inside a single transaction; the other store types receive
+        the concatenated dataframe through _store. The columns are fixed by the first batch
+
+        Args:
+            batches: iterable of dataframes
+            store_name: file or table name to store the dataframe
+            endpoint: API endpoint name. Default None
 
+        Returns:
+            None
+        '''
+        if self.store_type == 'csv':
+            columns = None
+            with open(self.local_path + '/' + store_name +'.csv', 'w', newline = '') as file:
+                for df_temp in batches:
+                    if columns is None:
+                        columns = df_temp.columns
+                        df_temp.to_csv(file, index = False)
+                    else:
+                        df_temp.reindex(columns = columns).to_csv(file, header = False, index = False)
+
+        elif self.store_type == 'xlsx' and (self.xlsx_stream or self.workbook):
+            self._store_xlsx(batches, store_name)
+
+        elif self.store_type in ('postgres', 'mysql'):
+            engine = self._get_engine()
+            con = engine.raw_connection()
+            cur = con.cursor()
+            columns = None
+            rows = 0
+            table = store_name
+
+            try:
+                for df_temp in batches:
+                    if columns is None:
+                        columns = df_temp.columns
+                        if self.store_mode == 'swap':
+                            if self.store_type == 'mysql':
+                                sys.exit('Invalid Option')
+                            table = self._swap_staging(cur, df_temp, store_name, engine)
+
+                        elif self.store_mode == 'trunc':
+                            if self.store_type == 'mysql' and not _import('sqlalchemy', self.store_type).inspect(engine).has_table(store_name):
+                                self._create_table(df_temp, store_name, engine)
+                            cur.execute('truncate table ' + store_name +';')
+
+                        elif self.store_mode == 'create':
+                            self._create_table(df_temp, store_name, engine, if_exists = 'replace')
+
+                    if self.store_type == 'postgres':
+                        output = io.StringIO()
+                        df_temp.reindex(columns = columns).to_csv(output, sep = '\t', header = False, index = False)
+                        output.seek(0)
+                        cur.copy_from(output, table, null = "") # null values become ''
+                    else:
+                        self._mysql_load(cur, df_temp.reindex(columns = columns), store_name)
+                    rows += len(df_temp)
+
+                if rows == 0:
+                    con.rollback()
+                    sys.exit('Empty Dataframe')
+
+                if self.store_mode == 'swap':
+                    self._swap(cur, store_name)
                 con.commit()
+            finally:
                 con.close()
 
-        elif self.store_type == 'mysql':
-            if len(df) == 0:
-                sys.exit('Empty Dataframe')
+        else:
+            frames = list(batches)
+            self._store(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(), store_name, endpoint)
+
+    def _output(self, pages, parse, store_name, return_df, key = None, endpoint = None, dedupe = None):
+        '''
+        Function to parse the pages returned by a call function, store the dataframes and build its return.
+        With stream = True the dataframes are stored as they arrive through _store_batches, otherwise they are
+        concatenated once and stored through _store. With a key the result is upserted through _store_upsert and
+        with store_mode = diff only the rows changed since the last store are written through _store_diff.
+        Pages, rows, normalization and store time are recorded in self.stats
+
+        Args:
+            pages: iterable of API responses
+            parse: function converting one response to a dataframe
+            store_name: file or table name to store the dataframe
+            return_df: boolean to set return or not the dataframe from the API
+            key: column used to upsert the result. Default None (store accordingly to store_mode)
+            endpoint: API endpoint name. Default None
+            dedupe: column whose values already returned by a previous page are dropped, for parsed and
+                checkpoint replayed pages alike. Default None (keep every row)
+
+        Returns:
+            DataFrame or None
+        '''
+        start = time.perf_counter()
+        rows = [0]
+        with self._lock:
+            saved_before = self.stats.get(endpoint, {}).get('memory_saved', 0)
+
+        #checkpoint units read by this call, removed once it is stored
+        units = []
+        replayed = [0]
+        seen = set()
+
+        def frames():
+            for r in pages:
+                parse_start = time.perf_counter()
+                unit = r.get('_checkpoint')
+                if unit is not None and r.get('_replayed'):
+                    df_temp = self._get_checkpoint().load(unit)
+                    replayed[0] += 1
+                else:
+                    df_temp = parse(r)
+                    if unit is not None:
+                        self._get_checkpoint().save(unit, df_temp, r)
+                if unit is not None:
+                    units.append(unit)
+                if dedupe is not None and dedupe in df_temp:
+                    df_temp = df_temp[~df_temp[dedupe].isin(seen)].reset_index(drop = True)
+                    seen.update(df_temp[dedupe])
+                if self.compact:
+                    df_temp = self._compact(df_temp, endpoint)
+                rows[0] += len(df_temp)
+                self._emit('page', endpoint, pages = 1, rows = len(df_temp), normalize_seconds = time.perf_counter() - parse_start)
+                yield df_temp
+
+        if self.stream and key is None and self.store_mode != 'diff':
+            kept = []
+            fetching = [0.0]
+
+            def batches():
+                #time spent here is fetch and parse time, not store time
+                resumed = time.perf_counter()
+                for df_temp in frames():
+                    fetching[0] += time.perf_counter() - resumed
+                    if return_df:
+                        kept.append(df_temp)
+                    yield df_temp
+                    resumed = time.perf_counter()
+                fetching[0] += time.perf_counter() - resumed
+
+            store_start = time.perf_counter()
+            self._store_batches(batches(), store_name, endpoint)
+            store_seconds = time.perf_counter() - store_start - fetching[0]
+            #empty pages would turn the typed columns back to object
+            df = pd.concat([df_temp for df_temp in kept if len(df_temp) > 0] or kept, ignore_index=True) if kept else pd.DataFrame()
+            if self.compact:
+                df = self._compact(df, endpoint, categories = True)
+        else:
+            parsed = list(frames())
+            df = pd.concat([df_temp for df_temp in parsed if len(df_temp) > 0] or parsed, ignore_index=True) if parsed else pd.DataFrame()
+            if self.compact:
+                df = self._compact(df, endpoint, categories = True)
+
+            store_start = time.perf_counter()
+            if key is not None:
+                self._store_upsert(df, store_name, key, endpoint)
+            elif self.store_mode == 'diff':
+                self._store_diff(df, store_name, self.diff_key, endpoint)
             else:
-                engine_path = 'mysql+mysqldb://'+ str(self.db_user) + ':' + str(self.db_password) + '@' + str(self.db_host) \
-                            + ':' + str(self.db_port) + '/' + str(self.database)  
-                engine = create_engine(engine_path)        
-                con = engine.raw_connection()
+                self._store(df, store_name, endpoint)
+            store_seconds = time.perf_counter() - store_start
+
+        if units:
+            if replayed[0]:
+                logger.info('--------{}: resumed {} of {} pages from the checkpoint--------'.format(endpoint, replayed[0], len(units)))
+            self._get_checkpoint().remove(units)
+
+        seconds = time.perf_counter() - start
+        self._emit('store', endpoint, store_seconds = store_seconds, store_name = store_name)
+        self._emit('call', endpoint, calls = 1, seconds = seconds, store_name = store_name)
+        logger.info('--------{}: {} rows in {:.1f}s ({:.1f}s storing)--------'.format(endpoint, rows[0], seconds, store_seconds))
+        if self.compact:
+            with self._lock:
+                saved = self.stats.get(endpoint, {}).get('memory_saved', 0) - saved_before
+            logger.info('--------{}: compact dtypes saved {:.1f} MB--------'.format(endpoint, saved / 2 ** 20))
 
-                if self.store_mode == 'trunc':
-                    df.to_sql(store_name, con = engine, index = False, if_exists = 'replace')
-                
-                elif self.store_mode == 'create':
-                    df.head(0).to_sql(store_name, engine, if_exists = 'replace', index = False)
-                    
-                con.commit()
-                con.close()
-        
-        elif self.store_type is None:
-            return None
-            
+        if return_df:
+            result = df
         else:
-            sys.exit('Invalid Option')
+            result = None
+
+        return result
+
+    def _fetch_one(self, url):
+        '''
+        Generator to fetch a call that is not paginated, so the request runs when _output iterates it
 
+        Args:
+            url: full url passed to the API
+
+        Returns:
+            generator of dict
+        '''
+        yield self._request(url)
+
+    def _refresh_employee_index(self):
+        '''
+        Function to bring the employee index up to date and return it. The index is read from
+        employee_index_path the first time and, once older than employee_index_ttl, only the employees
+        updated since the last refresh are fetched (sorted by updated_at, stopping at the first page reaching
+        the previous refresh). It is rebuilt from every employee after employee_index_rebuild
+
+        Args:
+            None
+
+        Returns:
+            dict with the refreshed_at, rebuilt_at and watermark of the index and the list of employees with
+            their id, active, cost_center_id and updated_at
+        '''
+        #the default file is named after the token, so tenants sharing local_path keep their own index
+        path = self.employee_index_path or os.path.join(self.local_path, 'pontomais_employees_'
+                                                        + hashlib.sha256(self.token.encode('utf-8')).hexdigest()[:16] + '.json')
+
+        with self._employee_lock:
+            index = self._employee_index.get(path)
+            if index is None and os.path.exists(path):
+                with open(path) as file:
+                    index = json.load(file)
+
+            now = time.time()
+            if index is not None and now - index['refreshed_at'] < self.employee_index_ttl:
+                self._employee_index[path] = index
+                return index
+
+            rebuild = index is None or now - index['rebuilt_at'] >= self.employee_index_rebuild
+            watermark = None if rebuild else index['watermark']
+            employees = {} if rebuild else {employee['id'] : employee for employee in index['employees']}
+            updated = 0
+
+            for active in ('true', 'false'):
+                url_base = self.base_url + 'employees?active=' + active + '&attributes=id,cost_center,updated_at' \
+                         + '&count=true&sort_direction=desc&sort_property=updated_at&'
+
+                for r in self._fetch_pages(url_base, 'employees', self._per_page('employees')):
+                    reached = False
+                    for employee in r['employees']:
+                        updated_at = employee.get('updated_at')
+                        if watermark is not None and updated_at is not None and pd.Timestamp(updated_at) < pd.Timestamp(watermark):
+                            reached = True
+                            continue
+
+                        employees[employee['id']] = {'id' : employee['id'], 'active' : active == 'true', 'updated_at' : updated_at,
+                                                     'cost_center_id' : (employee.get('cost_center') or {}).get('id')}
+                        updated += 1
+
+                    #the next pages were updated before the last refresh
+                    if reached:
+                        break
+
+            dates = [pd.Timestamp(employee['updated_at']) for employee in employees.values() if employee['updated_at']]
+            index = {'refreshed_at' : now, 'rebuilt_at' : now if rebuild else index['rebuilt_at'],
+                     'watermark' : max(dates).isoformat() if dates else watermark, 'employees' : list(employees.values())}
+
+            with open(path + '.tmp', 'w') as file:
+                json.dump(index, file)
+            os.replace(path + '.tmp', path)
+            self._employee_index[path] = index
+
+        logger.info('--------Employee index {}: {} employees, {} fetched--------'.format(
+            'rebuilt' if rebuild else 'refreshed', len(employees), updated))
+
+        return index
+
+    def employees(self, active = True, cost_center_id = None, shard = None):
+        '''
+        Function to return employee ids from the employee index, refreshed as set by employee_index_ttl, so
+        calls like call_banco_horas don't need the full employee list from call_colaboradores
+
+        Args:
+            active: True for active employees, False for inactive ones or None for both. Default True
+            cost_center_id: cost center id or list of ids to keep. Default None (every cost center)
+            shard: tuple of shard index and number of shards, keeping the ids where id % number == index, to
+                split the employees across workers. Default None (every id)
+
+        Returns:
+            list of int sorted
+        '''
+        return self._employee_ids(active, cost_center_id, shard)
+
+    def _employee_ids(self, active, cost_center_id, shard):
+        '''
+        Function to filter the employee ids of the refreshed employee index. It backs employees() and the call
+        functions, so it stays blocking in the subclasses awaiting employees()
+
+        Args:
+            active, cost_center_id, shard: as in employees
+
+        Returns:
+            list of int sorted
+        '''
+        index = self._refresh_employee_index()
+
+        if cost_center_id is not None and not isinstance(cost_center_id, (list, tuple, set)):
+            cost_center_id = [cost_center_id]
+
+        ids = []
+        for employee in index['employees']:
+            if active is not None and employee['active'] != active:
+                continue
+            if cost_center_id is not None and employee['cost_center_id'] not in cost_center_id:
+                continue
+            if shard is not None and employee['id'] % shard[1] != shard[0]:
+                continue
+            ids.append(employee['id'])
+
+        return sorted(ids)
 
-    def call_abonos(self, store_name, start_date, end_date, medical_certificate = ['true','false'], return_df = False):
+    def call_abonos(self, store_name, start_date, end_date, medical_certificate = ['true','false'], return_df = False, incremental = False):
         '''
-        Function to call the Abonos API and store the return
+        Function to call the Abonos API and store the return. With date_window set the range is fetched in
+        concurrent windows
 
         Args:
             store_name: file or table name to store the dataframe
@@ -148,38 +1996,32 @@ class Get:
             end_date: 'YYYY-MM-DD' format. End date passed to the API
             medical_certificate: list containing 'true' and/or 'false'. Default ['true','false']
             return_df: boolean to set return or not the dataframe from the API. Default False
+            incremental: boolean to request only the days after the last sync and upsert the result by id. Default False
 
         Returns:
             DataFrame or None
         '''
-        print('--------Call Abonos--------')
-        url_base = 'https://api.pontomais.com.br/external_api/v1/allowances?'
-        start_date = start_date
-        end_date = end_date
-        medical_certificate = medical_certificate
-        
-        df = pd.DataFrame()
-
-        for i in range(len(medical_certificate)):
-            print('--------Loop Medical Certificate--------')
-            print('Medical Certificate = ' + str(medical_certificate[i]))
-            #Concatenate the URL and call the API
-            url = url_base + 'start_date=' + start_date + '&' + 'end_date=' + end_date + '&' + 'medical_certificate=' + str(medical_certificate[i])
-            r = requests.get(url, headers = self.header).json()
-
-            #parse the result into a dataframe and concatenate the loop calls into one dataframe
+        logger.info('--------Call Abonos--------')
+        url_base = self.base_url + 'allowances?'
+        if incremental:
+            start_date = self._incremental_start('allowances', store_name, start_date)
+
+        def parse(r):
+            #parse the json, an empty window has no columns to fix
+            if not r['exemptions']:
+                return pd.DataFrame()
             df_temp = pd.json_normalize(r['exemptions'])
             df_temp['observation'] = df_temp['observation'].str.replace(' \n',' ')
             df_temp['answered_by.team.leader_ids'] = [', '.join(map(str, l)) for l in df_temp['answered_by.team.leader_ids']]
-            df = pd.concat([df,df_temp],ignore_index=True)
+            return df_temp
+
+        pages = self._fetch_windows(url_base, start_date, end_date, medical_certificate)
+        #the records already returned by a previous window are dropped
+        result = self._output(pages, parse, store_name, return_df, key = 'id' if incremental else None, endpoint = 'allowances',
+                              dedupe = 'id')
+        if incremental:
+            self._set_state('watermark.allowances.' + store_name, end_date)
 
-        self._store(df, store_name)
-            
-        if return_df:
-            result = df            
-        else:
-            result = None
-        
         return result
 
     def call_afastamentos(self, store_name, return_df = False):
@@ -193,76 +2035,75 @@ class Get:
         Returns:
             DataFrame or None
         '''
-        print('--------Get Afastamentos--------')
+        logger.info('--------Get Afastamentos--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/absences'
+        url_base = self.base_url + 'absences'
         url = url_base
-        r = requests.get(url, headers = self.header).json()
 
-        #parse the json
-        df_temp = pd.json_normalize(r['absences'])
-        df = df_temp
+        def parse(r):
+            #parse the json
+            df_temp = pd.json_normalize(r['absences'])
+            return df_temp
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
-    #TODO page loop
-    def call_banco_horas(self, store_name, employee_id, withdraw = ['true', 'false'], return_df = False):
+        pages = self._fetch_one(url)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'absences')
+
+    def call_banco_horas(self, store_name, employee_id = None, withdraw = ['true', 'false'], return_df = False, max_workers = None,
+                         start_date = None, end_date = None, incremental = False, active = True, cost_center_id = None, shard = None):
         '''
-        Function to call the Banco de Horas API and store the return
+        Function to call the Banco de Horas API and store the return. Every (withdraw, employee, page) call is
+        scheduled on a bounded pool and the result keeps the withdraw, employee and page order
 
         Args:
             store_name: file or table name to store the dataframe
-            employee_id: list of employees id to pass to the API
+            employee_id: list of employees id to pass to the API. Default None (taken from employees() filtered
+                by active, cost_center_id and shard)
             withdraw: list containing 'true' and/or 'false'. Default ['true','false']
             return_df: boolean to set return or not the dataframe from the API. Default False
+            max_workers: maximum number of concurrent calls. Default None (uses self.max_workers)
+            start_date: 'YYYY-MM-DD' format. Start date passed to the API. Default None (no filter)
+            end_date: 'YYYY-MM-DD' format. End date passed to the API. Default None (no filter, today when incremental)
+            incremental: boolean to request only the days after the last sync and upsert the result by id. Default False
+            active, cost_center_id, shard: filters of employees() used when employee_id is None. Default True, None, None
             
         Returns:
             DataFrame or None
         '''
     
-        print('--------Get Banco de Horas--------')
-        url_base = 'https://api.pontomais.com.br/external_api/v1/time_balance_entries?count=true&sort_property=date&sort_direction=desc&attributes=id,date,withdraw,amount,employee_id,observation,updated_by&'
-        page = 1
-        per_page = 100
-        df = pd.DataFrame()
-
-        #loop withdraw
-        print('--------Loop Withdraw--------')
-        for i in range(len(withdraw)):
-            print('Withdraw = ' + str(withdraw[i]))
+        logger.info('--------Get Banco de Horas--------')
+        if employee_id is None:
+            employee_id = self._employee_ids(active, cost_center_id, shard)
 
-            print('--------Loop Employee--------')
-            for j in range(len(employee_id)):     
-                i = 0
-                meta_count = per_page
+        url_base = self.base_url + 'time_balance_entries?count=true&sort_property=date&sort_direction=desc&attributes=' + self._attributes('time_balance_entries') + '&'
 
-                while meta_count >= per_page:
-                    print('--------ID: {} Page {}--------'.format(employee_id[j], page))
-                    #set the url and call the API
-                    url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page) + '&' + 'employee_id=' + str(employee_id[j]) + '&' + 'withdraw=' + str(withdraw[i])
-                    r = requests.get(url, headers = self.header).json()
+        if incremental:
+            start_date = self._incremental_start('time_balance_entries', store_name, start_date)
+            end_date = end_date or date.today().isoformat()
 
-                    #parse the json and concatenate the dataframes
-                    df_temp = pd.json_normalize(r['time_balance_entries'])
-                    df = pd.concat([df, df_temp], ignore_index=True)
+        if start_date is not None:
+            url_base = url_base + 'start_date=' + start_date + '&'
+        if end_date is not None:
+            url_base = url_base + 'end_date=' + end_date + '&'
 
-                    #refresh meta_count with the number of elements returned
-                    meta_count = pd.json_normalize(r['meta'])['count'].iloc[0]
-                    i += 1 #increment the iteration number
+        url_bases = []
+        labels = []
+
+        for i in range(len(withdraw)):
+            for j in range(len(employee_id)):
+                url_bases.append(url_base + 'employee_id=' + str(employee_id[j]) + '&' + 'withdraw=' + str(withdraw[i]) + '&')
+                labels.append('ID: {} Withdraw: {}'.format(employee_id[j], withdraw[i]))
+
+        def parse(r):
+            #parse the json
+            df_temp = self._decode(r['time_balance_entries'], 'time_balance_entries')
+            return df_temp
+
+        per_page = self._per_page('time_balance_entries')
+        pages = self._fetch_many(url_bases, 'time_balance_entries', per_page, max_workers, labels)
+        result = self._output(pages, parse, store_name, return_df, key = 'id' if incremental else None, endpoint = 'time_balance_entries')
+        if incremental:
+            self._set_state('watermark.time_balance_entries.' + store_name, end_date)
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
         return result
 
     def call_centro_custo(self, store_name, return_df = False):
@@ -277,24 +2118,18 @@ class Get:
             DataFrame or None
         '''
     
-        print('--------Get Centro de Custos--------')
+        logger.info('--------Get Centro de Custos--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/cost_centers'
+        url_base = self.base_url + 'cost_centers?attributes=' + self._attributes('cost_centers')
         url = url_base
-        r = requests.get(url, headers = self.header).json()
-        
-        #parse the json
-        df_temp = pd.json_normalize(r['cost_centers'])
-        df = df_temp[['id','code','name']]
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df_cc
-        else:
-            result = None
-        
-        return result
+        def parse(r):
+            #parse the json
+            df_temp = self._decode(r['cost_centers'], 'cost_centers')
+            return df_temp
+
+        pages = self._fetch_one(url)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'cost_centers')
     
     def call_cidade(self, store_name, return_df = False):
         '''
@@ -308,38 +2143,18 @@ class Get:
             DataFrame or None
         '''
     
-        print('--------Get Cidades--------')
+        logger.info('--------Get Cidades--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/cities?attributes=id,name&name=curitiba&sort_direction=asc&count=true&'
-        page = 1
-        per_page = 100
-        i = 0
-        meta_count = per_page
-        df = pd.DataFrame()
-
-        while meta_count >= per_page:
-            print('--------Page {}--------'.format(page))
-            url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page)
-            r = requests.get(url, headers = self.header).json()
+        url_base = self.base_url + 'cities?attributes=' + self._attributes('cities') + '&name=curitiba&sort_direction=asc&count=true&'
+        per_page = self._per_page('cities')
 
+        def parse(r):
             #parse the json
-            df_temp = pd.json_normalize(r['cities'])
-            df_temp = df_temp[['id','name','state']]
-            df = pd.concat([df, df_temp], ignore_index=True)
-            
-            #refresh meta_count with the number of elements returned
-            meta_count = pd.json_normalize(r['meta'])['count'].iloc[0]
-            i += 1 #increment the iteration number
+            df_temp = self._decode(r['cities'], 'cities')
+            return df_temp
 
-
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_pages(url_base, 'cities', per_page)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'cities')
     
     def call_colaboradores(self, store_name, return_df = False):
         '''
@@ -353,39 +2168,19 @@ class Get:
             DataFrame or None
         '''
         
-        print('--------Get Colaboradores--------')
+        logger.info('--------Get Colaboradores--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/employees?active=true&attributes=id,first_name,last_name,email,pin,is_clt,cpf,nis,registration_number,time_card_source,has_time_cards,use_qrcode,enable_geolocation,work_hours,cost_center,user,enable_offline_time_cards,login&count=true&sort_direction=asc&sort_property=first_name&'
-        page = 1
-        per_page = 100
-        i = 0
-        meta_count = per_page
-        df = pd.DataFrame()
-
-        while meta_count >= per_page:
-            print('--------Page {}--------'.format(page))
-            url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page)
-            r = requests.get(url, headers = self.header).json()
+        url_base = self.base_url + 'employees?active=true&attributes=' + self._attributes('employees') + '&count=true&sort_direction=asc&sort_property=first_name&'
+        per_page = self._per_page('employees')
 
+        def parse(r):
             #parse the json
-            df_temp = pd.json_normalize(r['employees'])
-            df_temp = df_temp[['id','first_name','last_name','email','is_clt','user.id','user.active','user.confirmed_at']]
-            df.rename(columns={'user.id': 'user_id','user.active':'active','user.confirmed_at':'confirmed_at'}, inplace=True)
+            df_temp = self._decode(r['employees'], 'employees')
             df_temp['full_name'] = df_temp['first_name'] + ' ' + df_temp['last_name']
-            df = pd.concat([df, df_temp], ignore_index=True)
+            return df_temp
 
-            #refresh meta_count with the number of elements returned
-            meta_count = pd.json_normalize(r['meta'])['count'].iloc[0]
-            i += 1 #increment the iteration number
-
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_pages(url_base, 'employees', per_page)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'employees')
 
     def call_departamento(self, store_name, return_df = False):
         '''
@@ -399,28 +2194,23 @@ class Get:
             DataFrame or None
         '''
         
-        print('--------Get Departamentos--------')
+        logger.info('--------Get Departamentos--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/departments'
+        url_base = self.base_url + 'departments?attributes=' + self._attributes('departments')
         url = url_base
-        r = requests.get(url, headers = self.header).json()
-        
-        #parse the json
-        df_temp = pd.json_normalize(r['departments'])
-        df = df_temp[['id','code','name','employees_count']]
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        def parse(r):
+            #parse the json
+            df_temp = self._decode(r['departments'], 'departments')
+            return df_temp
+
+        pages = self._fetch_one(url)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'departments')
 
-    def call_excecoes_jornada(self, store_name, start_date, end_date, medical_certificate = ['true','false'], return_df = False):
+    def call_excecoes_jornada(self, store_name, start_date, end_date, medical_certificate = ['true','false'], return_df = False, incremental = False):
         '''
-        Function to call the Exceções de Jornada API and store the return
+        Function to call the Exceções de Jornada API and store the return. With date_window set the range is
+        fetched in concurrent windows
 
         Args:
             store_name: file or table name to store the dataframe
@@ -428,35 +2218,34 @@ class Get:
             end_date: 'YYYY-MM-DD' format. End date passed to the API
             medical_certificate: list containing 'true' and/or 'false'. Default ['true','false']
             return_df: boolean to set return or not the dataframe from the API. Default False
+            incremental: boolean to request only the days after the last sync and upsert the result by id. Default False
             
         Returns:
             DataFrame or None
         '''
         
-        print('--------Get Exceções de Jornada--------')
-        url_base = 'https://api.pontomais.com.br/external_api/v1/exemptions?'
-        df = pd.DataFrame()
-
-        for i in range(len(medical_certificate)):
-            print('--------Loop Medical Certificate--------')
-            print('Medical certificate = ' + str(medical_certificate[i]))
-            #set the url and call the API
-            url = url_base + 'start_date=' + start_date + '&' + 'end_date=' + end_date + '&' + 'medical_certificate=' + str(medical_certificate[i])
-            r = requests.get(url, headers = self.header).json()
-
-            #parse the json and concatenate the df
+        logger.info('--------Get Exceções de Jornada--------')
+        url_base = self.base_url + 'exemptions?'
+
+        if incremental:
+            start_date = self._incremental_start('exemptions', store_name, start_date)
+
+        def parse(r):
+            #parse the json, an empty window has no columns to fix
+            if not r['exemptions']:
+                return pd.DataFrame()
             df_temp = pd.json_normalize(r['exemptions'])
             df_temp['observation'] = df_temp['observation'].str.replace(' \n',' ')
             df_temp['answered_by.team.leader_ids'] = [', '.join(map(str, l)) for l in df_temp['answered_by.team.leader_ids']]
-            df = pd.concat([df, df_temp], ignore_index=True)
+            return df_temp
+
+        pages = self._fetch_windows(url_base, start_date, end_date, medical_certificate)
+        #the records already returned by a previous window are dropped
+        result = self._output(pages, parse, store_name, return_df, key = 'id' if incremental else None, endpoint = 'exemptions',
+                              dedupe = 'id')
+        if incremental:
+            self._set_state('watermark.exemptions.' + store_name, end_date)
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
         return result
     
     def call_feriados(self, store_name, return_df = False):
@@ -470,38 +2259,17 @@ class Get:
         Returns:
             DataFrame or None
         '''
-        print('--------Get Feriados--------')
-        url_base = 'https://api.pontomais.com.br/external_api/v1/holidays?attributes=id,name,fixed,date,active,team,department,business_unit,cost_center,shift&count=true&'
-        page = 1
-        per_page = 100
-        i = 0
-        meta_count = per_page
-        df = pd.DataFrame()
-
-        while meta_count >= per_page:
-            print('--------Page {}--------'.format(page))
-
-            #set the url and call the API
-            url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page)
-            r = requests.get(url, headers = self.header).json()
+        logger.info('--------Get Feriados--------')
+        url_base = self.base_url + 'holidays?attributes=' + self._attributes('holidays') + '&count=true&'
+        per_page = self._per_page('holidays')
 
+        def parse(r):
             #parse the json
-            df_temp = pd.json_normalize(r['holidays'])
-            df_temp = df_temp[['id','name','date','team','department','business_unit','cost_center']]
-            df = pd.concat([df, df_temp], ignore_index=True)
-
-            #refresh meta_count with the number of elements returned
-            meta_count = pd.json_normalize(r['meta'])['count'].iloc[0]
-            i += 1 #increment the iteration number
+            df_temp = self._decode(r['holidays'], 'holidays')
+            return df_temp
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_pages(url_base, 'holidays', per_page)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'holidays')
     
     def call_gestores(self, store_name, return_df = False):
         '''
@@ -515,37 +2283,17 @@ class Get:
             DataFrame or None
         '''
 
-        print('--------Get Gestores--------')
-        url_base = 'https://api.pontomais.com.br/external_api/v1/possible_leaders?count=true&'
-        page = 1
-        per_page = 100
-        i = 0
-        meta_count = per_page
-        df = pd.DataFrame()
-
-        while meta_count >= per_page:
-            print('--------Page {}--------'.format(page))
-            #set the url and call the API
-            url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page)
-            r = requests.get(url, headers = self.header).json()
+        logger.info('--------Get Gestores--------')
+        url_base = self.base_url + 'possible_leaders?attributes=' + self._attributes('possible_leaders') + '&count=true&'
+        per_page = self._per_page('possible_leaders')
 
+        def parse(r):
             #parse the json
-            df_temp = pd.json_normalize(r['leaders'])
-            df_temp = df_temp[['id','name']]
-            df = pd.concat([df, df_temp], ignore_index=True)
+            df_temp = self._decode(r['leaders'], 'possible_leaders')
+            return df_temp
 
-            #refresh meta_count with the number of elements returned
-            meta_count = pd.json_normalize(r['meta'])['count'].iloc[0]
-            i += 1 #increment the iteration number
-
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_pages(url_base, 'leaders', per_page)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'possible_leaders')
 
     def call_grupo_acesso(self, store_name, return_df = False):
         '''
@@ -559,24 +2307,18 @@ class Get:
             DataFrame or None
         '''
         
-        print('--------Get Grupos de Acesso--------')
+        logger.info('--------Get Grupos de Acesso--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/users/groups?attributes=id,name'
+        url_base = self.base_url + 'users/groups?attributes=' + self._attributes('users/groups')
         url = url_base
-        r = requests.get(url, headers = self.header).json()
 
-        #parse the json
-        df_temp = pd.json_normalize(r['groups'])
-        df = df_temp[['id','name']]
+        def parse(r):
+            #parse the json
+            df_temp = self._decode(r['groups'], 'users/groups')
+            return df_temp
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_one(url)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'users/groups')
     
     def call_unidade_negocio(self, store_name, return_df = False):
         '''
@@ -590,39 +2332,18 @@ class Get:
             DataFrame or None
         '''
 
-        print('--------Get Unidade de Negócio--------')
+        logger.info('--------Get Unidade de Negócio--------')
         #Unidade de Negócio
-        url_base = 'https://api.pontomais.com.br/external_api/v1/business_units?'
-        page = 1
-        per_page = 100
-        i = 0
-        meta_count = per_page
-        df = pd.DataFrame()
-        
-        while meta_count >= per_page:
-            print('--------Page {}--------'.format(page))
-            #set the url and call the API
-            url = url_base + 'page=' + str(page + i) + '&' + 'per_page=' + str(per_page)
-            r = requests.get(url, headers = self.header).json()
+        url_base = self.base_url + 'business_units?attributes=' + self._attributes('business_units') + '&'
+        per_page = self._per_page('business_units')
 
+        def parse(r):
             #parse the json
-            df_temp = pd.json_normalize(r['business_units'])
-            df_temp = df_temp[['id','code','name']]
-            df = pd.concat([df, df_temp], ignore_index=True)
-
-            #refresh meta_count with the number of elements returned
-            #this response doesn't return the quantity of elements
-            meta_count = df_temp.shape[0]
-            i += 1 #increment the iteration number
+            df_temp = self._decode(r['business_units'], 'business_units')
+            return df_temp
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
+        pages = self._fetch_pages(url_base, 'business_units', per_page)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'business_units')
 
     def call_usuarios(self, store_name, return_df = False):
         '''
@@ -636,21 +2357,115 @@ class Get:
             DataFrame or None
         '''
         
-        print('--------Get Usuários--------')
+        logger.info('--------Get Usuários--------')
         #set the url and call the API
-        url_base = 'https://api.pontomais.com.br/external_api/v1/users?attributes=id,group,employee,sign_in_count,last_sign_in_at,last_sign_in_ip,confirmed_at,active,admin'
+        url_base = self.base_url + 'users?attributes=id,group,employee,sign_in_count,last_sign_in_at,last_sign_in_ip,confirmed_at,active,admin'
         url = url_base
-        r = requests.get(url, headers = self.header).json()
 
-        #parse the json
-        df_temp = pd.json_normalize(r['users'])
-        df = df_temp
+        def parse(r):
+            #parse the json
+            df_temp = pd.json_normalize(r['users'])
+            return df_temp
 
-        self._store(df, store_name)
-        
-        if return_df:
-            result = df
-        else:
-            result = None
-        
-        return result
\ No newline at end of file
+        pages = self._fetch_one(url)
+        return self._output(pages, parse, store_name, return_df, endpoint = 'users')
+
+    def _job_method(self, method):
+        '''
+        Function to return the call function run by a run_all job
+
+        Args:
+            method: call function name
+
+        Returns:
+            function
+        '''
+        return getattr(self, method)
+
+    def run_all(self, jobs, max_workers = None):
+        '''
+        Function to run many call functions concurrently, each job fetching and storing on its own thread so
+        the store of one endpoint overlaps the API calls of the others. A job starts as soon as the jobs it
+        depends on are finished, receiving a column of their dataframes as argument
+
+        Args:
+            jobs: list of dicts with the keys
+                method: call function name, e.g. 'call_colaboradores'
+                store_name: file or table name to store the dataframe
+                name: job name used by depends_on. Default store_name
+                args: dict of other arguments of the call function. Default {}
+                depends_on: dict of argument and 'job_name.column' filled with the values of that column,
+                    e.g. {'employee_id' : 'colaboradores.id'}. Default {}
+            max_workers: maximum number of jobs running at once. Default None (all jobs)
+
+        Returns:
+            DataFrame with the name, method, status, rows, seconds and error of each job
+        '''
+        jobs = [dict(job, name = job.get('name', job['store_name'])) for job in jobs]
+        names = [job['name'] for job in jobs]
+        if len(set(names)) != len(names):
+            sys.exit('Duplicated job name')
+
+        #dataframes are only kept for the jobs other jobs depend on
+        required = {source.split('.')[0] for job in jobs for source in job.get('depends_on', {}).values()}
+        unknown = required - set(names)
+        if unknown:
+            sys.exit('Unknown dependency: ' + ', '.join(sorted(unknown)))
+
+        results = {}
+        dataframes = {}
+
+        def run(job):
+            args = dict(job.get('args', {}))
+            for argument, source in job.get('depends_on', {}).items():
+                name, column = source.split('.', 1)
+                args[argument] = dataframes[name][column].dropna().unique().tolist()
+
+            logger.info('--------Run {}--------'.format(job['name']))
+            start = time.perf_counter()
+            df = self._job_method(job['method'])(job['store_name'], return_df = job['name'] in required, **args)
+            return df, time.perf_counter() - start
+
+        pending = list(jobs)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers = max_workers or max(1, len(jobs)))
+        try:
+            while pending or running:
+                for job in list(pending):
+                    dependencies = {source.split('.')[0] for source in job.get('depends_on', {}).values()}
+                    failed = [name for name in dependencies if name in results and results[name]['status'] != 'done']
+                    if failed:
+                        pending.remove(job)
+                        results[job['name']] = {'status' : 'skipped', 'rows' : None, 'seconds' : None,
+                                                'error' : 'dependency failed: ' + ', '.join(sorted(failed))}
+                    elif all(name in dataframes for name in dependencies):
+                        pending.remove(job)
+                        running[executor.submit(run, job)] = job
+
+                if not running:
+                    #what is left depends on itself through a cycle
+                    for job in pending:
+                        results[job['name']] = {'status' : 'skipped', 'rows' : None, 'seconds' : None, 'error' : 'dependency cycle'}
+                    break
+
+                finished, _ = wait(running, return_when = FIRST_COMPLETED)
+                for future in finished:
+                    job = running.pop(future)
+                    try:
+                        df, seconds = future.result()
+                    except (Exception, SystemExit) as error:
+                        logger.error('--------Failed {}: {}--------'.format(job['name'], error))
+                        results[job['name']] = {'status' : 'failed', 'rows' : None, 'seconds' : None, 'error' : repr(error)}
+                        continue
+
+                    if job['name'] in required:
+                        dataframes[job['name']] = df
+                    results[job['name']] = {'status' : 'done', 'rows' : None if df is None else len(df), 'seconds' : seconds,
+                                            'error' : None}
+        finally:
+            executor.shutdown(wait = True)
+
+        self.summary()
+
+        return pd.DataFrame([dict(name = job['name'], method = job['method'], **results[job['name']]) for job in jobs],
+                            columns = ['name', 'method', 'status', 'rows', 'seconds', 'error'])
@@ -0,0 +1,147 @@
+#bibliotecas
+import threading
+import time
+
+class RateLimiter:
+    '''
+    Token bucket rate limiter with adaptive concurrency shared by every request of a Get instance. Until the
+    API throttles a request the rate is only a starting point: it doubles every step in which it held the
+    requests back, so the pools run as fast as the API tolerates. The rate of the first throttled response
+    becomes the ceiling. Each throttled response halves the request rate and the number of concurrent
+    requests, and pauses new requests until the Retry-After delay has passed; successful responses grow
+    them back one step at a time, up to the ceiling
+
+    Args:
+        rate: starting requests per second, None for no rate limit until the API throttles. Default = 10
+        burst: requests that can be sent at once after an idle period. Default = 10
+        max_concurrency: maximum concurrent requests. Default = 16
+        min_rate: lower bound of the adaptive rate. Default = 0.5
+
+    Other Atributes:
+        listeners: list of functions called without arguments after every release, so callers that can't
+            wait on the threading condition, such as an event loop, learn a concurrency slot was freed
+    '''
+
+    def __init__(self, rate = 10, burst = 10, max_concurrency = 16, min_rate = 0.5):
+        #ceiling of the rate, set by the first throttled response
+        self.max_rate = None
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.min_rate = min_rate
+
+        self.tokens = burst
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.limited = False
+        self.sent = 0
+        self.started_at = None
+        self.paused_until = 0
+        self.updated_at = time.monotonic()
+        self.listeners = []
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _take(self):
+        now = time.monotonic()
+        self._refill(now)
+
+        if now < self.paused_until:
+            return self.paused_until - now
+        elif self.in_flight >= self.concurrency:
+            return None
+        elif self.rate is not None and self.tokens < 1:
+            #the rate held a request back, so it is what limits the requests
+            self.limited = True
+            return (1 - self.tokens) / self.rate
+
+        if self.rate is not None:
+            self.tokens -= 1
+        if self.started_at is None:
+            self.started_at = now
+        self.sent += 1
+        self.in_flight += 1
+        return 0
+
+    def acquire(self):
+        '''
+        Function to block until a request can be sent, then take a token and a concurrency slot
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        with self._condition:
+            while True:
+                wait = self._take()
+                if wait == 0:
+                    return None
+
+                self._condition.wait(wait)
+
+    def try_acquire(self):
+        '''
+        Function to take a token and a concurrency slot without blocking, used by callers that can't block
+        such as an event loop
+
+        Args:
+            None
+
+        Returns:
+            0 when taken, otherwise the seconds to wait before trying again (None while every concurrency slot is taken)
+        '''
+        with self._condition:
+            return self._take()
+
+    def release(self, throttled = False, retry_after = None):
+        '''
+        Function to give back the concurrency slot of a finished request and adapt the rate and concurrency
+
+        Args:
+            throttled: boolean telling the API throttled the request (HTTP 429). Default False
+            retry_after: seconds asked by the API before the next request. Default None
+
+        Returns:
+            None
+        '''
+        with self._condition:
+            self.in_flight -= 1
+
+            if throttled:
+                if self.rate is None:
+                    #unbounded until now: start from the rate the requests were sent at
+                    self.rate = self.sent / max(time.monotonic() - self.started_at, 1)
+                    self.tokens = min(self.tokens, self.burst)
+                if self.max_rate is None:
+                    self.max_rate = self.rate
+
+                self.throttled += 1
+                self.successes = 0
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.concurrency = max(1, self.concurrency // 2)
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            else:
+                #additive increase: one step after as many successes as the current concurrency
+                self.successes += 1
+                if self.successes >= self.concurrency:
+                    self.successes = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    if self.max_rate is not None:
+                        self.rate = min(self.max_rate, self.rate + max(1, self.max_rate / 10))
+                    elif self.rate is not None and self.limited:
+                        #not throttled yet: keep growing while the rate holds the requests back
+                        self.rate = self.rate * 2
+                    self.limited = False
+
+            self._condition.notify_all()
+            for listener in self.listeners:
+                listener()
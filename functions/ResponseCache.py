@@ -0,0 +1,125 @@
+#bibliotecas
+import hashlib
+import sqlite3
+import time
+
+class ResponseCache:
+    '''
+    On-disk cache of API responses backed by a sqlite file. Entries are keyed by url and token, keep the
+    ETag/Last-Modified validators returned by the API and are evicted in least recently used order
+
+    Args:
+        path: sqlite file path
+        max_entries: maximum number of responses kept. Default = 1000
+    '''
+
+    def __init__(self, path, max_entries = 1000):
+        self.path = path
+        self.max_entries = max_entries
+
+        con = self._connect()
+        try:
+            con.execute('create table if not exists responses (key text primary key, body blob, etag text, last_modified text, '
+                        'stored_at real, accessed_at real)')
+            con.commit()
+        finally:
+            con.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout = 30)
+
+    @staticmethod
+    def key(url, token):
+        '''
+        Function to build the cache key of a call. The token is hashed so it is not written to disk
+
+        Args:
+            url: full url passed to the API
+            token: authentication token
+
+        Returns:
+            str
+        '''
+        return hashlib.sha256((token + ' ' + url).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        '''
+        Function to read a cached response and mark it as recently used
+
+        Args:
+            key: cache key
+
+        Returns:
+            dict with body, etag, last_modified and stored_at or None
+        '''
+        con = self._connect()
+        try:
+            row = con.execute('select body, etag, last_modified, stored_at from responses where key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            con.execute('update responses set accessed_at = ? where key = ?', (time.time(), key))
+            con.commit()
+        finally:
+            con.close()
+
+        return {'body' : row[0], 'etag' : row[1], 'last_modified' : row[2], 'stored_at' : row[3]}
+
+    def set(self, key, body, etag = None, last_modified = None):
+        '''
+        Function to store a response and evict the least recently used ones above max_entries
+
+        Args:
+            key: cache key
+            body: raw response content
+            etag: ETag header returned by the API. Default None
+            last_modified: Last-Modified header returned by the API. Default None
+
+        Returns:
+            None
+        '''
+        now = time.time()
+        con = self._connect()
+        try:
+            con.execute('replace into responses (key, body, etag, last_modified, stored_at, accessed_at) values (?, ?, ?, ?, ?, ?)',
+                        (key, sqlite3.Binary(body), etag, last_modified, now, now))
+            con.execute('delete from responses where key not in (select key from responses order by accessed_at desc limit ?)',
+                        (self.max_entries,))
+            con.commit()
+        finally:
+            con.close()
+
+    def touch(self, key):
+        '''
+        Function to restart the TTL of a response revalidated by the API (304 Not Modified)
+
+        Args:
+            key: cache key
+
+        Returns:
+            None
+        '''
+        now = time.time()
+        con = self._connect()
+        try:
+            con.execute('update responses set stored_at = ?, accessed_at = ? where key = ?', (now, now, key))
+            con.commit()
+        finally:
+            con.close()
+
+    def clear(self):
+        '''
+        Function to remove every cached response
+
+        Args:
+            None
+
+        Returns:
+            None
+        '''
+        con = self._connect()
+        try:
+            con.execute('delete from responses')
+            con.commit()
+        finally:
+            con.close()
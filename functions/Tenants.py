@@ -0,0 +1,180 @@
+#bibliotecas
+import pandas as pd
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functions.Get import Get
+
+logger = logging.getLogger(__name__)
+
+#store types writing files, scoped by a tenant subdirectory of local_path
+FILE_STORES = ('csv', 'xlsx', 'parquet', 'arrow')
+
+#file attributes shared by every tenant, scoped by prefixing the file name with the tenant name
+SCOPED_FILES = ('state_path', 'employee_index_path')
+
+#columns of the dataframe returned by Tenants.run
+COLUMNS = ['tenant', 'name', 'method', 'status', 'rows', 'seconds', 'error']
+
+def run_tenant(tenant, jobs, attributes = None, max_workers = None):
+    '''
+    Function to run the jobs of one tenant through Get.run_all on its own Get instance, so each tenant has its
+    own token, session and rate limiter. It is module level to be sent to the processes of a ProcessPoolExecutor
+
+    Args:
+        tenant: dict with the name, token, store_type, store_mode and attributes of the tenant, already scoped
+        jobs: list of jobs as documented in Get.run_all, already scoped
+        attributes: dict of Get attributes shared by every tenant. Default None
+        max_workers: maximum number of jobs of the tenant running at once. Default None (all jobs)
+
+    Returns:
+        DataFrame with the tenant and the Get.run_all columns
+    '''
+    try:
+        with Get(tenant['token'], tenant.get('store_type'), tenant.get('store_mode', 'trunc')) as get:
+            for attribute, value in dict(attributes or {}, **tenant.get('attributes', {})).items():
+                setattr(get, attribute, value)
+
+            if get.store_type in FILE_STORES:
+                os.makedirs(get.local_path, exist_ok = True)
+
+            df = get.run_all(jobs, max_workers)
+
+    except (Exception, SystemExit) as error:
+        #a failure outside the jobs (configuration, state, ...) fails the whole tenant
+        df = pd.DataFrame([{'name' : None, 'method' : None, 'status' : 'failed', 'rows' : None, 'seconds' : None,
+                            'error' : repr(error)}])
+
+    df.insert(0, 'tenant', tenant['name'])
+
+    return df
+
+class Tenants:
+    '''
+    Multi-tenant runner making the same jobs for many client companies, each with its own access token. Every
+    tenant runs on its own Get instance, with its own session and rate limiter, in a thread or process pool.
+    The results are written to tenant-scoped targets: file stores write to a subdirectory of local_path named
+    after the tenant and database stores prefix the table names with the tenant name, unless the tenant sets
+    its own local_path or database in its attributes. A shared state_path or employee_index_path is prefixed
+    with the tenant name too
+
+    Args:
+        tenants: list of dicts with the keys
+            name: tenant name, letters, digits and underscores only
+            token: authentication token of the tenant
+            store_type, store_mode: passed to Get. Default the Tenants store_type and store_mode
+            attributes: dict of Get attributes of the tenant, e.g. database, db_user. Default {}
+            jobs: list of jobs of the tenant. Default the Tenants jobs
+        jobs: list of jobs as documented in Get.run_all, run for every tenant
+        executor: thread or process. Default = thread
+
+    Other Atributes:
+        store_type: store type of the tenants that don't set it. Default = None
+        store_mode: store mode of the tenants that don't set it. Default = trunc
+        attributes: dict of Get attributes shared by every tenant, e.g. local_path, db_host. Default = {}
+        max_workers: maximum number of tenants running at once. Default = 4
+        job_workers: maximum number of jobs of one tenant running at once. Default = None (all jobs)
+    '''
+
+    def __init__(self, tenants, jobs = None, executor = 'thread'):
+        self.tenants = tenants
+        self.jobs = jobs or []
+        self.executor = executor
+        self.store_type = None
+        self.store_mode = 'trunc'
+        self.attributes = {}
+        self.max_workers = 4
+        self.job_workers = None
+
+    def _scope(self, tenant):
+        '''
+        Function to build the tenant and jobs of a tenant writing to its scoped targets
+
+        Args:
+            tenant: dict of the tenant as documented in the class
+
+        Returns:
+            tuple of the tenant dict and the list of jobs
+        '''
+        tenant = dict(tenant, store_type = tenant.get('store_type', self.store_type),
+                      store_mode = tenant.get('store_mode', self.store_mode))
+        attributes = dict(tenant.get('attributes', {}))
+        jobs = [dict(job) for job in tenant.get('jobs', self.jobs)]
+
+        if tenant['store_type'] in FILE_STORES and 'local_path' not in attributes:
+            attributes['local_path'] = os.path.join(self.attributes.get('local_path', ''), tenant['name'])
+
+        elif tenant['store_type'] in ('postgres', 'mysql') and 'database' not in attributes:
+            for job in jobs:
+                #the job name keeps the unscoped store_name, so depends_on is unchanged
+                job.setdefault('name', job['store_name'])
+                job['store_name'] = tenant['name'] + '_' + job['store_name']
+
+        for attribute in SCOPED_FILES:
+            if self.attributes.get(attribute) and attribute not in attributes:
+                folder, file = os.path.split(self.attributes[attribute])
+                attributes[attribute] = os.path.join(folder, tenant['name'] + '_' + file)
+
+        tenant['attributes'] = attributes
+
+        return tenant, jobs
+
+    def run(self):
+        '''
+        Function to run the jobs of every tenant, logging the progress as the tenants finish. A failing tenant
+        doesn't stop the others
+
+        Args:
+            None
+
+        Returns:
+            DataFrame with the tenant, name, method, status, rows, seconds and error of each job
+        '''
+        names = [tenant.get('name', '') for tenant in self.tenants]
+        invalid = [name for name in names if not re.fullmatch(r'\w+', str(name))]
+        if invalid:
+            sys.exit('Invalid tenant name: ' + ', '.join(map(str, invalid)))
+        if len(set(names)) != len(names):
+            sys.exit('Duplicated tenant name')
+
+        if self.executor == 'thread':
+            executor = ThreadPoolExecutor(max_workers = self.max_workers)
+        elif self.executor == 'process':
+            executor = ProcessPoolExecutor(max_workers = self.max_workers)
+        else:
+            sys.exit('Invalid Option')
+
+        start = time.perf_counter()
+        results = {}
+        with executor:
+            futures = {}
+            for tenant in self.tenants:
+                scoped, jobs = self._scope(tenant)
+                futures[executor.submit(run_tenant, scoped, jobs, self.attributes, self.job_workers)] = tenant['name']
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    df = future.result()
+                except Exception as error:
+                    #the process running the tenant died
+                    df = pd.DataFrame([{'tenant' : name, 'name' : None, 'method' : None, 'status' : 'failed', 'rows' : None,
+                                        'seconds' : None, 'error' : repr(error)}])
+                results[name] = df
+
+                failed = int((df['status'] != 'done').sum())
+                log = logger.warning if failed else logger.info
+                log('--------Tenant {} finished ({}/{}): {} jobs done, {} failed or skipped--------'.format(
+                    name, len(results), len(futures), int((df['status'] == 'done').sum()), failed))
+
+        df = pd.concat([results[name] for name in names], ignore_index = True) if results else pd.DataFrame(columns = COLUMNS)
+        df = df.reindex(columns = COLUMNS)
+
+        failed = sorted(df.loc[df['status'] != 'done', 'tenant'].unique())
+        logger.info('--------{} tenants in {:.1f}s, {} with failures{}--------'.format(
+            len(names), time.perf_counter() - start, len(failed), ': ' + ', '.join(failed) if failed else ''))
+
+        return df
@@ -0,0 +1,64 @@
+#bibliotecas
+import argparse
+import json
+import logging
+import os
+import sys
+from functions.Get import Get
+from functions.Tenants import Tenants
+
+def main(argv = None):
+    '''
+    Command line entry point running the jobs of a json config file through Get.run_all
+
+    The config file keys are
+        token: authentication token. Default the PONTOMAIS_TOKEN environment variable
+        store_type, store_mode: passed to Get
+        attributes: dict of other Get attributes, e.g. local_path, database, db_user
+        max_workers: maximum number of jobs running at once. Default all jobs
+        jobs: list of jobs as documented in Get.run_all
+        tenants: list of tenants as documented in Tenants, running the jobs for every tenant instead of the token
+        tenant_workers: maximum number of tenants running at once. Default 4
+        executor: thread or process pool running the tenants. Default thread
+
+    Args:
+        argv: list of command line arguments. Default None (sys.argv)
+
+    Returns:
+        int exit code, 1 when a job failed or was skipped
+    '''
+    parser = argparse.ArgumentParser(prog = 'pontomais', description = 'Run a full refresh of Pontomais endpoints, for one token or many tenants')
+    parser.add_argument('config', help = 'json config file with the jobs to run')
+    parser.add_argument('--log-level', default = 'INFO', help = 'logging level. Default INFO')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level = args.log_level.upper(), format = '%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    with open(args.config) as file:
+        config = json.load(file)
+
+    if 'tenants' in config:
+        tenants = Tenants(config['tenants'], config.get('jobs'), config.get('executor', 'thread'))
+        tenants.store_type = config.get('store_type')
+        tenants.store_mode = config.get('store_mode', 'trunc')
+        tenants.attributes = config.get('attributes', {})
+        tenants.max_workers = config.get('tenant_workers', 4)
+        tenants.job_workers = config.get('max_workers')
+
+        summary = tenants.run()
+
+    else:
+        token = config.get('token', os.environ.get('PONTOMAIS_TOKEN', ''))
+
+        with Get(token, config.get('store_type'), config.get('store_mode', 'trunc')) as get:
+            for attribute, value in config.get('attributes', {}).items():
+                setattr(get, attribute, value)
+
+            summary = get.run_all(config['jobs'], config.get('max_workers'))
+
+    print(summary.to_string(index = False))
+
+    return 0 if (summary['status'] == 'done').all() else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,19 @@
 from setuptools import setup
 
+#optional backends, imported on their first use by the store types
+extras = {'postgres': ['sqlalchemy', 'psycopg2-binary'],
+          'mysql': ['sqlalchemy', 'mysqlclient'],
+          'parquet': ['pyarrow'],
+          'xlsx': ['openpyxl', 'xlsxwriter'],
+          'fast': ['orjson'],
+          'async': ['aiohttp']}
+extras['all'] = sorted(set(package for packages in extras.values() for package in packages))
+
 setup(name='pontomais-functions',
       version='1.0',
       description='Functions package to interact with Pontomais APIs',
       packages=['functions'],
-      zip_safe=False)
\ No newline at end of file
+      install_requires=['pandas', 'requests'],
+      extras_require=extras,
+      entry_points={'console_scripts': ['pontomais=functions.__main__:main']},
+      zip_safe=False)